@@ -1,8 +1,12 @@
-from scipy.optimize import fsolve
 from typing import Dict
 import numpy as np
 import pandas as pd
 
+from Backend_functions.iv_curve import iv_curve_payload
+from NOTC.diode_solver import check_mpp_mode, string_current, string_mpp
+from NOTC.instrumentation import timed
+
+@timed("bishop_stc")
 def bishop_from_matrices(
     area_df: pd.DataFrame,
     illum_df: pd.DataFrame,
@@ -11,7 +15,14 @@ def bishop_from_matrices(
     Rs_map: Dict[str, float] = None,
     Rsh_map: Dict[str, float] = None,
     label: str = "Pixolar",          # 🔴 LABEL ADDED
+    mpp: str = "grid",
+    iv_points: int = None,
 ) -> Dict:
+    """
+    mpp="exact" takes Vmp / Imp from string_mpp instead of the 400-point
+    grid; iv_points caps the returned IV curve (see iv_curve_payload).
+    """
+    check_mpp_mode(mpp)
 
     mat = pd.merge(area_df, illum_df, on="Cell", how="inner")
 
@@ -67,38 +78,25 @@ def bishop_from_matrices(
 
     V = np.linspace(0, Voc, 400)
 
-    def diode_eq(I, V, Iph, I0, Rs, Rsh):
-        return I - (
-            Iph
-            - I0 * (np.exp((V + I * Rs) / (n * Vt)) - 1)
-            - (V + I * Rs) / Rsh
-        )
-
-    I_tot = []
-    for v in V:
-        I_cells = []
-        for name in Iph_map:
-            try:
-                Is = fsolve(
-                    diode_eq,
-                    Iph_map[name],
-                    args=(v, Iph_map[name], I0_map[name],
-                          Rs_map[name], Rsh_map[name]),
-                    xtol=1e-8,
-                    maxfev=200,
-                )[0]
-                I_cells.append(max(Is, 0))
-            except:
-                I_cells.append(0)
-        I_tot.append(sum(I_cells))
-
-    I_tot = np.array(I_tot)
+    # Batched solve: all cells x all voltage points at once
+    names = list(Iph_map)
+    cell_args = (
+        np.array([Iph_map[c] for c in names]),
+        np.array([I0_map[c] for c in names]),
+        np.array([Rs_map[c] for c in names]),
+        np.array([Rsh_map[c] for c in names]),
+        n,
+        Vt,
+    )
+    I_tot = string_current(V, *cell_args, xtol=1e-8)
     P = I_tot * V
     idx = int(np.argmax(P))
 
     Isc = float(I_tot[0])
     Imp = float(I_tot[idx])
     Vmp = float(V[idx])
+    if mpp == "exact":
+        _, Vmp, Imp = (float(x) for x in string_mpp(*cell_args, Voc, xtol=1e-8))
     FF = (Vmp * Imp) / (Voc * Isc) if Isc > 0 else 0.0
 
     # 🔥 EXACT OLD RETURN — NOTHING DIFFERENT
@@ -111,8 +109,82 @@ def bishop_from_matrices(
         f"Voc_series_{label}": Voc * n_cells_series,
         f"Vmp_series_{label}": Vmp * n_cells_series,
         f"Pmax_series_{label}": Vmp * n_cells_series * Imp,
-        f"iv_curve_{label}": {
-            "voltage": [round(v, 3) for v in V],
-            "current": [round(i, 3) for i in I_tot],
-        },
-    }
\ No newline at end of file
+        f"iv_curve_{label}": iv_curve_payload(V, I_tot, iv_points, keep=(idx,)),
+    }
+
+@timed("bishop_stc")
+def bishop_sweep(
+    areas: Dict[str, np.ndarray],
+    illum: Dict[str, np.ndarray],
+    temp_c: float = 25.0,
+    n_cells_series: int = 5,
+    Rs: float = 0.0022,
+    Rsh: float = 2082.0,
+    label: str = "Pixolar",
+    mpp: str = "grid",
+    iv_points: int = None,
+) -> list:
+    """
+    bishop_from_matrices for a whole tilt sweep in one batched solve.
+
+    areas / illum map the area and illumination matrix columns to
+    (n_tilts, n_cells) arrays (stc_area_arrays / illumination_arrays).
+    Returns one bishop_from_matrices-style dict per tilt.
+    """
+    check_mpp_mode(mpp)
+    q = 1.602e-19
+    k = 1.381e-23
+    T = temp_c + 273.15
+    Vt = k * T / q
+    n = 1.2
+    Voc = 0.729
+
+    ref_cell_area_cm2 = (182 * 182) / 100.0
+    Jph_1000 = 13.857 / ref_cell_area_cm2
+    beta = 0.7
+
+    Ad, As, Ar, Ar2 = (
+        np.asarray(areas[key], float) / 100.0
+        for key in ("Direct_Area_mm2", "Shaded_Area_mm2", "Rear_Area_mm2", "Rear_Area_2")
+    )
+    Gd, Gs, Gr, Gr2 = (
+        illum[key] for key in ("Direct_Wm2", "Shaded_Wm2", "Rear_Wm2", "Rear2_Wm2")
+    )
+
+    Iph = Jph_1000 * (
+        Ad * (Gd / 1000)
+        + As * (Gs / 1000)
+        + beta * Ar * (Gr / 1000)
+        + Ar2 * beta * (Gr2 / 1000)
+    )
+    I0 = 1e-12 * np.maximum(Ad + As + Ar + Ar2, 1e-6)
+
+    V = np.linspace(0, Voc, 400)
+    n_cells = Iph.shape[-1]
+    I_tot = string_current(
+        V, Iph, I0, np.full(n_cells, Rs), np.full(n_cells, Rsh), n, Vt, xtol=1e-8,
+    )
+    idx = np.argmax(I_tot * V, axis=-1)
+    Vmp_t, Imp_t = V[idx], I_tot[np.arange(len(idx)), idx]
+    if mpp == "exact":
+        _, Vmp_t, Imp_t = string_mpp(Iph, I0, Rs, Rsh, n, Vt, Voc, xtol=1e-8)
+
+    V_round = [round(v, 3) for v in V]
+    results = []
+    for I_row, i, Vmp, Imp in zip(I_tot, idx, Vmp_t, Imp_t):
+        Isc = float(I_row[0])
+        Imp = float(Imp)
+        Vmp = float(Vmp)
+        FF = (Vmp * Imp) / (Voc * Isc) if Isc > 0 else 0.0
+        results.append({
+            f"Isc_{label}": Isc,
+            f"Voc_{label}": Voc,
+            f"Vmp_{label}": Vmp,
+            f"Imp_{label}": Imp,
+            f"FF_{label}": FF,
+            f"Voc_series_{label}": Voc * n_cells_series,
+            f"Vmp_series_{label}": Vmp * n_cells_series,
+            f"Pmax_series_{label}": Vmp * n_cells_series * Imp,
+            f"iv_curve_{label}": iv_curve_payload(V, I_row, iv_points, keep=(i,), V_round=V_round),
+        })
+    return results
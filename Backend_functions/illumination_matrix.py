@@ -1,6 +1,14 @@
+import logging
+
+import numpy as np
 import pandas as pd
 
+from NOTC.instrumentation import timed
+
+logger = logging.getLogger(__name__)
 
+
+@timed("illumination")
 def make_illumination_matrix(area_df:pd.DataFrame,G_dir:float,G_diff:float,G_albedo:float,use_cos_for_direct:bool=True,verbose:bool=True)->pd.DataFrame:
     """
     Illumination Assumptions
@@ -27,6 +35,20 @@ def make_illumination_matrix(area_df:pd.DataFrame,G_dir:float,G_diff:float,G_alb
         })
     out=pd.DataFrame(rows)
 
-    if verbose:
-        print(out.to_string(index=False))
-    return out
\ No newline at end of file
+    if verbose and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("illumination matrix\n%s", out.to_string(index=False))
+    return out
+
+@timed("illumination")
+def illumination_arrays(cosine,G_dir:float,G_diff:float,G_albedo:float,use_cos_for_direct:bool=True):
+    """make_illumination_matrix for a (n_tilts, n_cells) Cosine array."""
+    from Backend_functions.area_matrix_calcualtion import round_like_python
+    cosine=np.asarray(cosine,float)
+    direct=(G_dir*cosine if use_cos_for_direct else np.full_like(cosine,G_dir)) + G_diff
+    full=lambda g: np.full_like(cosine,round(g,2))
+    return {
+        "Direct_Wm2":round_like_python(direct,2),
+        "Shaded_Wm2":full(G_diff),
+        "Rear_Wm2":full(G_albedo),
+        "Rear2_Wm2":full(G_diff),
+    }
@@ -0,0 +1,65 @@
+import heapq
+
+import numpy as np
+
+
+def downsample_curve(x, y, max_points, keep=()):
+    """
+    Indices of at most max_points points of the polyline (x, y) that keep
+    its shape: starting from the end points (and `keep`), the point
+    farthest from the current polyline is added until max_points are
+    used or the rest lie on it. Distances are measured with both axes
+    scaled to [0, 1], so the flat Isc plateau of an IV curve collapses to a
+    few points and the knee around the MPP gets the budget.
+    """
+    if max_points is not None and max_points < 2:
+        raise ValueError(f"max_points must be at least 2, got {max_points}")
+    x = np.asarray(x, float)
+    y = np.asarray(y, float)
+    n = len(x)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    chosen = sorted({0, n - 1, *(int(k) for k in keep)})
+    if len(chosen) >= max_points:
+        return np.array(chosen)
+
+    xs = (x - x.min()) / ((x.max() - x.min()) or 1.0)
+    ys = (y - y.min()) / ((y.max() - y.min()) or 1.0)
+
+    def farthest(lo, hi):
+        if hi - lo < 2:
+            return None
+        dx, dy = xs[hi] - xs[lo], ys[hi] - ys[lo]
+        d = np.abs(dy * (xs[lo + 1:hi] - xs[lo]) - dx * (ys[lo + 1:hi] - ys[lo]))
+        j = int(np.argmax(d))
+        return (-d[j] / (np.hypot(dx, dy) or 1.0), lo, hi, lo + 1 + j)
+
+    heap = [s for s in (farthest(a, b) for a, b in zip(chosen, chosen[1:])) if s]
+    heapq.heapify(heap)
+    chosen = set(chosen)
+    while heap and len(chosen) < max_points:
+        neg_d, lo, hi, k = heapq.heappop(heap)
+        if neg_d >= 0.0:
+            break
+        chosen.add(k)
+        for s in (farthest(lo, k), farthest(k, hi)):
+            if s:
+                heapq.heappush(heap, s)
+    return np.array(sorted(chosen))
+
+
+def iv_curve_payload(V, I, max_points=None, keep=(), V_round=None):
+    """
+    {"voltage", "current"} lists rounded to 3 decimals, downsampled when
+    max_points is set. V_round: the rounded V list when the caller sends
+    many curves on the same grid (rounding dominates otherwise).
+    """
+    if max_points is not None:
+        idx = downsample_curve(V, I, int(max_points), keep)
+        if len(idx) < len(V):
+            V, I = np.asarray(V)[idx], np.asarray(I)[idx]
+            V_round = None
+    return {
+        "voltage": V_round if V_round is not None else [round(v, 3) for v in V],
+        "current": [round(i, 3) for i in I],
+    }
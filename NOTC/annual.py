@@ -0,0 +1,194 @@
+"""
+Full-year timeline for the runners (timeline="hourly_full_year").
+
+Instead of the 21st of each month, every daylight timestamp of the year
+is simulated at a fixed step (step_minutes, default hourly). The year is
+walked in chunks of ANNUAL_CHUNK timestamps; each chunk goes through solar
+position, shading geometry (make_area_tensor over all tilts at once) and
+the Bishop solve as whole arrays, and only the per-record dicts are built
+in Python. Monthly / yearly aggregates are kept incrementally by the
+result adapters, so peak memory follows the chunk size, not the year.
+
+Tilts are always compared on the grid here (one tensor per chunk), so
+tilt_search does not apply.
+
+Configuration (environment):
+    NOTC_ANNUAL_CHUNK   timestamps per chunk, default 48
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+TIMELINES = ("sampled", "hourly_full_year")
+ANNUAL_CHUNK = int(os.getenv("NOTC_ANNUAL_CHUNK", "48"))
+
+
+def check_timeline(timeline):
+    if timeline not in TIMELINES:
+        raise ValueError(f"timeline must be one of {TIMELINES}, got {timeline!r}")
+    return timeline
+
+
+def annual_timestamps(tz, year, step_minutes=60):
+    step_minutes = int(step_minutes)
+    if not 1 <= step_minutes <= 24 * 60:
+        raise ValueError(f"step_minutes must be in 1..1440, got {step_minutes}")
+    return pd.date_range(f"{year}-01-01", f"{year + 1}-01-01", freq=f"{step_minutes}min",
+                         tz=tz, inclusive="left")
+
+
+def _daylight_chunks(lat, lon, t_local, tz, weather, chunk):
+    """Per chunk: global indices of the daylight timestamps and their inputs."""
+    from NOTC.tilt_analysis import site_sun_and_clearsky_batch
+    from NOTC.weather import ambient_temperature
+
+    for start in range(0, len(t_local), chunk):
+        t = t_local[start:start + chunk]
+        zen, azi, dni, dhi, ghi = site_sun_and_clearsky_batch(lat, lon, t.tz_convert("UTC"), tz)
+        day = np.flatnonzero(zen < 90)
+        if not len(day):
+            continue
+        temp_air, source = ambient_temperature(lat, lon, t[day], tz, weather)
+        yield (start + day, zen[day], azi[day], dni[day], dhi[day], ghi[day],
+               temp_air.to_numpy(float), source)
+
+
+def _irradiance_2d(dni, dhi, ghi, zen, sun_azi, mod_az, alpha_ground, beta=0.7):
+    """Analytic 2D tilt and compute_2d_irradiance at that tilt, as arrays."""
+    zen_r = np.radians(zen)
+    delta = np.radians(sun_azi - mod_az)
+    tilt = np.abs(np.degrees(np.arctan(np.tan(zen_r) * np.cos(delta))))
+    tilt_r = np.radians(tilt)
+
+    cos_theta = np.maximum(
+        np.cos(zen_r) * np.cos(tilt_r) + np.sin(zen_r) * np.sin(tilt_r) * np.cos(delta), 0.0
+    )
+    G = dni * cos_theta + dhi + beta * alpha_ground * ghi * (1 - np.cos(tilt_r)) / 2
+    return tilt, G
+
+
+def annual_rows(
+    ctx,
+    lat,
+    lon,
+    alpha_rear,
+    year=2024,
+    step_minutes=60,
+    samples=120,
+    tilts=range(0, 61, 5),
+    shading="sampled",
+    weather=None,
+    per_hour_best=False,
+    return_tilt_curve=False,
+    chunk=None,
+    design=None,
+    mpp="grid",
+):
+    """
+    Row generator for the full-year timeline, same (i, row) / ctx contract
+    as the sampled runners.
+
+    per_hour_best=True picks the best grid tilt per timestamp (best-tilt
+    runner); otherwise a first pass over the year picks the tilt with the
+    highest annual 3D energy and the second pass reports at that tilt
+    (fixed-tilt runner).
+    """
+    from NOTC.diode_solver import check_mpp_mode
+    from NOTC.area_notc import make_area_tensor
+    from NOTC.geometry import get_design
+    from NOTC.normal_bishop import bishop_module1_arrays
+    from NOTC.pixi_bishop import bishop2_arrays
+    from NOTC.tilt_analysis import infer_timezone
+    from NOTC.weather import ResolvedWeather
+
+    check_mpp_mode(mpp)
+    chunk = int(chunk or ANNUAL_CHUNK)
+    design = get_design(design)
+    tz = infer_timezone(lat, lon)
+    mod_az = 180.0 if lat >= 0 else 0.0
+    t_local = annual_timestamps(tz, year, step_minutes)
+    # one TMY fetch for the whole year
+    weather = ResolvedWeather.resolve(lat, lon, weather)
+    tilts = list(tilts)
+    tilt_arr = np.asarray(tilts, float)
+
+    def chunks():
+        return _daylight_chunks(lat, lon, t_local, tz, weather, chunk)
+
+    def solve_3d(zen, azi, dni, dhi, ghi, T_amb, tilt_grid):
+        frac, cos_i = make_area_tensor(zen, azi, tilt_grid, mod_az, samples, shading, design)
+        return bishop2_arrays(frac, cos_i, dni, dhi, ghi, alpha_rear, T_amb, design, mpp)
+
+    ctx.t_local, ctx.t_utc, ctx.fixed_tilt_3d = t_local, t_local.tz_convert("UTC"), None
+    ctx.summary = {"timeline": "hourly_full_year", "step_minutes": int(step_minutes),
+                   "design": design.id, "design_version": design.version, "mpp": mpp}
+
+    # ---------------- PASS 1: YEARLY BEST TILT (FIXED) ----------------
+    if not per_hour_best:
+        tilt_energy = np.zeros(len(tilts))
+        for _, zen, azi, dni, dhi, ghi, T_amb, _ in chunks():
+            tilt_energy += solve_3d(zen, azi, dni, dhi, ghi, T_amb, tilt_arr)["Pmax"].sum(axis=0)
+        k_best = int(np.argmax(tilt_energy))
+        best_tilt_3d = tilts[k_best]
+        ctx.fixed_tilt_3d = best_tilt_3d
+        ctx.summary["best_3D_tilt"] = int(best_tilt_3d)
+        if return_tilt_curve:
+            ctx.summary["tilt_energy_curve"] = [
+                {"tilt": t, "Pmax_3D_total": float(e)} for t, e in zip(tilts, tilt_energy)
+            ]
+
+    # ---------------- PASS 2: RECORDS ----------------
+    weather_source = weather.source
+    n_records = 0
+    for idx, zen, azi, dni, dhi, ghi, T_amb, weather_source in chunks():
+        if per_hour_best:
+            out = solve_3d(zen, azi, dni, dhi, ghi, T_amb, tilt_arr)
+            k = np.argmax(out["Pmax"], axis=1)
+            rows = np.arange(len(k))
+            out_3d = {key: v[rows, k] for key, v in out.items()}
+            tilt_3d = [tilts[j] for j in k]
+        else:
+            out = solve_3d(zen, azi, dni, dhi, ghi, T_amb, tilt_arr[k_best:k_best + 1])
+            out_3d = {key: v[:, 0] for key, v in out.items()}
+            tilt_3d = [best_tilt_3d] * len(idx)
+
+        tilt_2d, G2D = _irradiance_2d(dni, dhi, ghi, zen, azi, mod_az, alpha_rear)
+        out_2d = bishop_module1_arrays(G2D, T_amb, dni, n_cells=5, mpp=mpp)
+
+        for j, i in enumerate(idx):
+            row = {
+                "zen": float(zen[j]),
+                "azi": float(azi[j]),
+                "dni": float(dni[j]),
+                "dhi": float(dhi[j]),
+                "ghi": float(ghi[j]),
+                "T_ambient": float(T_amb[j]),
+
+                # 2D
+                "tilt_analytic_2D": float(tilt_2d[j]),
+                "Isc_2D": float(out_2d["Isc"][j]),
+                "Voc_2D": float(out_2d["Voc_series"][j]),
+                "Imp_2D": float(out_2d["Imp"][j]),
+                "Vmp_2D": float(out_2d["Vmp_series"][j]),
+                "Pmax_2D": float(out_2d["Pmax_series"][j]),
+                "FF_2D": float(out_2d["FF"][j]),
+
+                # 3D
+                "tilt_optimal_3D": tilt_3d[j],
+                "Isc_3D": float(out_3d["Isc"][j]),
+                "Imp_3D": float(out_3d["Imp"][j]),
+                "Vmp_3D": float(out_3d["Vmp"][j]),
+                "Voc_3D": float(out_3d["Voc"][j]),
+                "Pmax_3D": float(out_3d["Pmax"][j]),
+                "FF_3D": float(out_3d["FF"][j]),
+            }
+            if per_hour_best:
+                row["tilt_evals_3D"] = len(tilts)
+            yield int(i), row
+        n_records += len(idx)
+
+    ctx.summary["weather_source"] = weather_source
+    if per_hour_best:
+        ctx.summary["tilt_search"] = "grid"
+        ctx.summary["tilt_evaluations_total"] = n_records * len(tilts)
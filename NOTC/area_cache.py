@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+
+from NOTC.instrumentation import METRICS, cache_counts
+
+
+class AreaMatrixCache:
+    """
+    Bounded, thread-safe LRU cache for per-cell shading results.
+
+    Keys are built by the caller (see make_area_matrix_fast); values are
+    read-only (direct fraction, cosine) arrays. Hit / miss / eviction
+    counters are kept so the cache can be sized from production numbers.
+    """
+
+    def __init__(self, maxsize=20000):
+        self.maxsize = int(maxsize)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+# process-wide instance shared by both simulation runners
+AREA_CACHE = AreaMatrixCache(maxsize=int(os.getenv("NOTC_AREA_CACHE_SIZE", "20000")))
+
+# projected sun angle is snapped to this step (degrees) before keying
+ANGLE_STEP_DEG = float(os.getenv("NOTC_AREA_CACHE_ANGLE_STEP", "0.01"))
+
+
+@METRICS.register_collector
+def _area_cache_metrics():
+    s = AREA_CACHE.stats()
+    return cache_counts("area", s["hits"], s["misses"]) + [
+        ("notc_cache_entries", {"cache": "area"}, s["size"]),
+        ("notc_cache_evictions_total", {"cache": "area"}, s["evictions"]),
+    ]
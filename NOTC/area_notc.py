@@ -1,7 +1,12 @@
 import math
+import threading
 import numpy as np
-import pandas as pd
-from numba import njit
+from numba import njit, prange
+
+from NOTC.area_cache import AREA_CACHE, ANGLE_STEP_DEG
+from NOTC.exact_shading import check_shading_mode, exact_direct_fractions
+from NOTC.geometry import get_design
+from NOTC.instrumentation import timed
 
 @njit(cache=True)
 def _cross_z(a0, a1, b0, b1):
@@ -27,26 +32,28 @@ def _ray_intersects_segment(px, pz, rx, rz, ax, az, bx, bz):
     u = _cross_z(qpx, qpz, rx, rz) / rxs
     return (t >= 1e-9) and (0.0 <= u <= 1.0)
 
-RAW_CELLS = np.array([
-    [113.91, 0.00, 1.31, 0.00, 112.6],
-    [0.00, 114.23, 0.00, 1.63, 112.6],
-    [97.91, 102.41, 55.46, 87.63, 43.2],
-    [100.55, 48.51, 55.10, 33.73, 47.8],
-    [104.80, 70.44, 69.59, 81.84, 37.0],
-    [104.07, 16.45, 68.87, 27.84, 37.0],
-    [59.95, 60.05, 32.82, 77.77, 32.4],
-    [46.73, 108.48, 19.49, 90.94, 32.4],
-])
-
-CELL_NAMES = [
-    "C8", "C1", "C4", "C6",
-    "C5", "C7",
-    "C3", "C2"
-]
-
-KEEP_ALBEDO = [True, True, False, False, False, False, False, False]
-
-def make_area_matrix_fast(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, samples=120):
+# the default design (see NOTC.geometry); module-level names kept for
+# callers that only ever deal with the Pixolar cross-section
+DEFAULT_DESIGN = get_design()
+RAW_CELLS = DEFAULT_DESIGN.cells
+CELL_NAMES = DEFAULT_DESIGN.cell_names
+KEEP_ALBEDO = DEFAULT_DESIGN.keep_albedo
+
+# changes whenever the cross-section does; part of every shading cache key
+GEOMETRY_VERSION = DEFAULT_DESIGN.version
+
+def projected_sun_angle(zen_deg, azi_deg, module_azimuth_deg):
+    """
+    In-plane sun angle (deg from vertical, positive towards the module
+    azimuth) -- the only part of the sun position the 2D shading sees.
+    """
+    zen = math.radians(zen_deg)
+    sun_h = math.sin(zen) * math.cos(math.radians(azi_deg - module_azimuth_deg))
+    return math.degrees(math.atan2(sun_h, math.cos(zen)))
+
+@njit(cache=True)
+def _shade_rotated(zen_deg, azi_deg, module_azimuth_deg, seg, samples, exact):
+    """Direct fraction and cosine per cell for one sun and one rotated (6, n) segment block."""
     zen = math.radians(zen_deg)
     azi = math.radians(azi_deg)
 
@@ -60,46 +67,160 @@ def make_area_matrix_fast(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, sample
     rx, rz = _normalize2(-sun_h, -sz)
     lx, lz = -rx, -rz
 
-    th = math.radians(tilt_deg)
-    Yt, Xt, Yb, Xb, W = RAW_CELLS.T
-
-    c, s = math.cos(th), math.sin(th)
-    Xtr, Ytr = c*Xt - s*Yt, s*Xt + c*Yt
-    Xbr, Ybr = c*Xb - s*Yb, s*Xb + c*Yb
-
-    dx, dz = Xbr - Xtr, Ybr - Ytr
-    L = np.sqrt(dx*dx + dz*dz) + 1e-12
-    nx, nz = -(dz/L), (dx/L)
-
-    cos_i = np.clip(np.abs(nx*lx + nz*lz), 0, 1)
+    Ax, Az, Bx, Bz, nx, nz = seg[0], seg[1], seg[2], seg[3], seg[4], seg[5]
+    n = seg.shape[1]
+    cos_i = np.empty(n)
+    for i in range(n):
+        cos_i[i] = min(max(abs(nx[i]*lx + nz[i]*lz), 0.0), 1.0)
 
-    shade0 = np.zeros(8)
-    Ax, Az, Bx, Bz = Xtr, Ytr, Xbr, Ybr
+    if exact:
+        return exact_direct_fractions(Ax, Az, Bx, Bz, -rx, -rz), cos_i
 
-    for i in range(8):
-        ts = (np.arange(samples)+0.5)/samples
-        px = Ax[i] + (Bx[i]-Ax[i])*ts
-        pz = Az[i] + (Bz[i]-Az[i])*ts
+    frac = np.empty(n)
+    for i in range(n):
         visible = 0
         for k in range(samples):
+            t = (k + 0.5) / samples
+            px = Ax[i] + (Bx[i]-Ax[i])*t
+            pz = Az[i] + (Bz[i]-Az[i])*t
             blocked = False
-            for j in range(8):
+            for j in range(n):
                 if j == i: continue
-                if _ray_intersects_segment(px[k], pz[k], -rx, -rz,
+                if _ray_intersects_segment(px, pz, -rx, -rz,
                                            Ax[j], Az[j], Bx[j], Bz[j]):
                     blocked = True
                     break
             if not blocked:
                 visible += 1
-        shade0[i] = visible / samples
-
-    A = W * 182.0
-
-    return pd.DataFrame({
-        "Cell": CELL_NAMES,
-        "Cosine": cos_i,
-        "Direct_Area_mm2": shade0 * A,
-        "Shaded_Area_mm2": (1 - shade0) * A,
-        "Rear_Area_mm2": np.where(KEEP_ALBEDO, A, 0),
-        "Rear_Area_2": np.where(~np.array(KEEP_ALBEDO), A, 0),
-    })
\ No newline at end of file
+        frac[i] = visible / samples
+
+    return frac, cos_i
+
+@njit(parallel=True, cache=True)
+def _area_kernel(zen_deg, azi_deg, segments, module_azimuth_deg, samples, exact):
+    n_times = zen_deg.shape[0]
+    n_tilts = segments.shape[0]
+    n = segments.shape[2]
+    frac = np.empty((n_times, n_tilts, n))
+    cosine = np.empty((n_times, n_tilts, n))
+    for b in prange(n_times * n_tilts):
+        t = b // n_tilts
+        k = b % n_tilts
+        f, c = _shade_rotated(zen_deg[t], azi_deg[t], module_azimuth_deg,
+                              segments[k], samples, exact)
+        frac[t, k, :] = f
+        cosine[t, k, :] = c
+    return frac, cosine
+
+_AREA_KERNEL_SIG = "(float64[::1], float64[::1], float64[:, :, ::1], float64, int64, boolean)"
+
+# Numba's fallback workqueue layer aborts on concurrent parallel launches
+# (e.g. from several Flask threads); each launch already uses every core.
+_parallel_lock = threading.Lock()
+
+@timed("shading")
+def make_area_tensor(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, samples=120,
+                     shading="sampled", design=None):
+    """
+    Direct-beam fraction and cosine for every (timestamp, tilt) pair in a
+    single compiled call. Returns two (n_times, n_tilts, n_cells) arrays.
+
+    shading="sampled" casts `samples` rays per cell; shading="exact" uses
+    the analytic interval method and ignores `samples`; shading="table"
+    interpolates the precomputed table in NOTC.shading_table.
+
+    `design` is a design id or ModuleDesign (default: DEFAULT_DESIGN); its
+    pre-rotated segments are used for tilts on the geometry tilt grid.
+    """
+    exact = check_shading_mode(shading) == "exact"
+    design = get_design(design)
+    if shading == "table":
+        from NOTC.shading_table import lookup_tensor
+        return lookup_tensor(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, design)
+    zen_deg = np.atleast_1d(np.asarray(zen_deg, float))
+    azi_deg = np.atleast_1d(np.asarray(azi_deg, float))
+    tilt_deg = np.atleast_1d(np.asarray(tilt_deg, float))
+
+    if zen_deg.size == 1 and tilt_deg.size == 1:
+        # skip the thread-pool launch for single evaluations
+        f, c = _shade_rotated(zen_deg[0], azi_deg[0], float(module_azimuth_deg),
+                              design.segment_block(tilt_deg[0]), int(samples), exact)
+        return f[None, None, :], c[None, None, :]
+
+    segments = design.segments(tilt_deg)
+    with _parallel_lock:
+        return _area_kernel(np.ascontiguousarray(zen_deg), np.ascontiguousarray(azi_deg),
+                            segments, float(module_azimuth_deg), int(samples), exact)
+
+def cached_area_arrays(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, samples=120,
+                       shading="sampled", cache=AREA_CACHE, design=None):
+    """
+    (direct fraction, cosine) per cell through the process-wide LRU cache.
+
+    The key is the projected sun angle snapped to ANGLE_STEP_DEG, the tilt,
+    the sample count, the shading mode and the design version. Misses are
+    computed at the snapped angle so a cached entry never depends on which
+    timestamp filled it.
+    """
+    design = get_design(design)
+    if check_shading_mode(shading) == "table":
+        frac, cos_i = make_area_tensor(zen_deg, azi_deg, tilt_deg,
+                                       module_azimuth_deg, samples, shading, design)
+        return frac[0, 0], cos_i[0, 0]
+
+    step = int(round(projected_sun_angle(zen_deg, azi_deg, module_azimuth_deg) / ANGLE_STEP_DEG))
+    key = (
+        step,
+        round(float(tilt_deg), 6),
+        int(samples) if shading == "sampled" else 0,
+        shading,
+        design.version,
+    )
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    # zen=phi, azi=module azimuth reproduces the same in-plane sun ray
+    frac, cos_i = make_area_tensor(step * ANGLE_STEP_DEG, module_azimuth_deg, tilt_deg,
+                                   module_azimuth_deg, samples, shading, design)
+    frac, cos_i = frac[0, 0], cos_i[0, 0]
+    frac.flags.writeable = False
+    cos_i.flags.writeable = False
+    cache.put(key, (frac, cos_i))
+    return frac, cos_i
+
+def warm_up_kernels():
+    """
+    Compile (or load from the Numba cache) every shading kernel. The
+    parallel kernel is compiled without being run, but compiling starts
+    the threading layer's pool; a preloading master that forks has to use
+    the workqueue layer (gunicorn.conf.py).
+    """
+    seg = DEFAULT_DESIGN.segment_block(10.0)
+    for exact in (False, True):
+        _shade_rotated(30.0, 180.0, 180.0, seg, 4, exact)
+    _area_kernel.compile(_AREA_KERNEL_SIG)
+    _ray_intersects_segment(0.0, 0.0, 0.0, 1.0, -1.0, 1.0, 1.0, 1.0)
+
+@timed("shading")
+def cell_areas(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, samples=120,
+               shading="sampled", use_cache=False, design=None):
+    """Per-cell areas and cosine for one sun / tilt as a CellState."""
+    from NOTC.cell_state import CellState
+    design = get_design(design)
+    if use_cache:
+        shade0, cos_i = cached_area_arrays(zen_deg, azi_deg, tilt_deg,
+                                           module_azimuth_deg, samples, shading, design=design)
+    else:
+        frac, cos_i = make_area_tensor(zen_deg, azi_deg, tilt_deg,
+                                       module_azimuth_deg, samples, shading, design)
+        shade0 = frac[0, 0]
+        cos_i = cos_i[0, 0]
+    return CellState.from_direct_fraction(shade0, cos_i, design)
+
+
+def make_area_matrix_fast(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, samples=120,
+                          shading="sampled", use_cache=False, design=None):
+    """cell_areas as the per-cell area DataFrame."""
+    return cell_areas(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, samples,
+                      shading, use_cache, design).area_frame()
@@ -0,0 +1,81 @@
+"""
+Per-cell state for one (timestamp, tilt) evaluation of the 3D module.
+
+The sampled runners evaluate the 8-cell cross-section thousands of times
+per request; building, merging and iterating DataFrames for 8 rows each
+time cost more than the physics. CellState keeps the same columns as
+fixed-layout float arrays (in the design's cell order) and only turns them
+into DataFrames when a caller asks (make_area_matrix_fast,
+apply_notc_irradiacne).
+"""
+import numpy as np
+import pandas as pd
+
+from NOTC.geometry import get_design
+
+# DataFrame column <-> slot
+AREA_FIELDS = {
+    "Cosine": "cosine",
+    "Direct_Area_mm2": "direct_area",
+    "Shaded_Area_mm2": "shaded_area",
+    "Rear_Area_mm2": "rear_area",
+    "Rear_Area_2": "rear_area_2",
+}
+IRRADIANCE_FIELDS = {
+    "Direct_Wm2": "direct_wm2",
+    "Shaded_Wm2": "shaded_wm2",
+    "Rear_Wm2": "rear_wm2",
+    "Rear2_Wm2": "rear2_wm2",
+}
+
+
+class CellState:
+    """Areas (mm2), cosine and, once set, irradiance (W/m2) per cell."""
+
+    __slots__ = ("names",) + tuple(AREA_FIELDS.values()) + tuple(IRRADIANCE_FIELDS.values())
+
+    def __init__(self, cosine, direct_area, shaded_area, rear_area, rear_area_2, names):
+        self.names = names
+        self.cosine = cosine
+        self.direct_area = direct_area
+        self.shaded_area = shaded_area
+        self.rear_area = rear_area
+        self.rear_area_2 = rear_area_2
+        self.direct_wm2 = self.shaded_wm2 = self.rear_wm2 = self.rear2_wm2 = None
+
+    @classmethod
+    def from_direct_fraction(cls, frac, cos_i, design=None):
+        # the rear split does not depend on the sun
+        d = get_design(design)
+        return cls(cos_i, frac * d.area_mm2, (1 - frac) * d.area_mm2,
+                   d.rear_area_mm2, d.rear_area_2_mm2, d.cell_names)
+
+    @classmethod
+    def from_frames(cls, area_df, illum_df=None):
+        """Inverse of area_frame() / illumination_frame(), joined on Cell."""
+        if illum_df is not None:
+            area_df = pd.merge(area_df, illum_df, on="Cell", how="inner")
+        col = lambda c: area_df[c].to_numpy(float)
+        state = cls(*(col(c) for c in AREA_FIELDS), names=list(area_df["Cell"]))
+        if illum_df is not None:
+            for c, slot in IRRADIANCE_FIELDS.items():
+                setattr(state, slot, col(c))
+        return state
+
+    @property
+    def has_irradiance(self):
+        return self.direct_wm2 is not None
+
+    def area_frame(self):
+        return pd.DataFrame({
+            "Cell": self.names,
+            **{c: getattr(self, slot) for c, slot in AREA_FIELDS.items()},
+        })
+
+    def illumination_frame(self):
+        if not self.has_irradiance:
+            raise ValueError("irradiance has not been set on this CellState")
+        return pd.DataFrame({
+            "Cell": np.asarray(self.names),
+            **{c: getattr(self, slot) for c, slot in IRRADIANCE_FIELDS.items()},
+        })
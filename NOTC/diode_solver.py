@@ -0,0 +1,308 @@
+import numpy as np
+from numba import njit
+
+from NOTC.instrumentation import record_solver
+
+# how Vmp / Imp are found: argmax over the caller's voltage grid, or the
+# segment-wise search of string_mpp
+MPP_MODES = ("grid", "exact")
+
+# string_mpp: default tolerance on Vmp (V)
+MPP_VTOL = 1e-6
+
+
+def check_mpp_mode(mpp):
+    if mpp not in MPP_MODES:
+        raise ValueError(f"mpp must be one of {MPP_MODES}, got {mpp!r}")
+    return mpp
+
+
+def solve_diode_current(V, Iph, I0, Rs, Rsh, n, Vt, xtol=1e-8, max_iter=100):
+    """
+    Solve the implicit single-diode equation for I, element-wise:
+
+        I = Iph - I0*(exp((V + I*Rs)/(n*Vt)) - 1) - (V + I*Rs)/Rsh
+
+    All inputs broadcast against each other, so a whole grid of
+    cells x voltages (x timestamps x tilts) is solved in one call.
+
+    Newton iterations start from I = Iph, like the old fsolve calls. The
+    residual is increasing and convex in I and is >= 0 at Iph, so the
+    iterates decrease monotonically onto the root without overshooting.
+    Stops once every step is below xtol relative to |I| (fsolve's xtol).
+    """
+    V, Iph, I0, Rs, Rsh, nVt = np.broadcast_arrays(
+        np.asarray(V, float),
+        np.asarray(Iph, float),
+        np.asarray(I0, float),
+        np.asarray(Rs, float),
+        np.asarray(Rsh, float),
+        np.asarray(n * np.asarray(Vt, float), float),
+    )
+
+    I = Iph.copy()
+    sweeps = 0
+    with np.errstate(over="ignore", invalid="ignore"):
+        for _ in range(max_iter):
+            sweeps += 1
+            e = np.exp((V + I * Rs) / nVt)
+            f = I - Iph + I0 * (e - 1.0) + (V + I * Rs) / Rsh
+            df = 1.0 + I0 * e * Rs / nVt + Rs / Rsh
+            step = f / df
+            I = I - step
+            if np.all(np.abs(step) <= xtol * (np.abs(I) + xtol)):
+                break
+    record_solver("numpy", sweeps, I.size)
+
+    # fsolve failures used to be caught and counted as 0 A
+    return np.where(np.isfinite(I), I, 0.0)
+
+
+def string_current(V, Iph, I0, Rs, Rsh, n, Vt, xtol=1e-8, max_iter=100):
+    """
+    Total current of parallel-connected cell segments on a voltage grid.
+
+    V        : (n_v,) voltage grid
+    Iph, I0  : (..., n_cells) per-cell photo / saturation currents
+    Rs, Rsh  : scalars or (..., n_cells)
+    Vt       : scalar or (...,) thermal voltage (per timestamp)
+
+    Returns (..., n_v): sum over cells of max(I_cell, 0), matching the
+    per-voltage fsolve loops it replaces.
+    """
+    V = np.asarray(V, float)
+    Iph = np.asarray(Iph, float)[..., None, :]
+    I0 = np.asarray(I0, float)[..., None, :]
+    Rs = np.asarray(Rs, float)
+    Rsh = np.asarray(Rsh, float)
+    if Rs.ndim:
+        Rs = Rs[..., None, :]
+    if Rsh.ndim:
+        Rsh = Rsh[..., None, :]
+    Vt = np.asarray(Vt, float)[..., None, None]
+
+    I = solve_diode_current(V[:, None], Iph, I0, Rs, Rsh, n, Vt,
+                            xtol=xtol, max_iter=max_iter)
+    return np.maximum(I, 0.0).sum(axis=-1)
+
+
+@njit(cache=True)
+def _string_current_kernel(V, Iph, I0, Rs, Rsh, nVt, xtol, max_iter):
+    m, n_cells = Iph.shape
+    out = np.zeros((m, V.shape[0]))
+    g = 1.0 / Rsh
+    steps = 0
+    for r in range(m):
+        inv = 1.0 / nVt[r]
+        for c in range(n_cells):
+            iph = Iph[r, c]
+            i0 = I0[r, c]
+            # I(V) decreases with V, so the previous voltage's root is
+            # above the next one: same monotone Newton, far fewer steps
+            I = iph
+            for j in range(V.shape[0]):
+                for _ in range(max_iter):
+                    steps += 1
+                    x = V[j] + I * Rs
+                    e = i0 * np.exp(x * inv)
+                    step = (I - iph + e - i0 + x * g) / (1.0 + (e * inv + g) * Rs)
+                    I -= step
+                    if abs(step) <= xtol * (abs(I) + xtol):
+                        break
+                if not np.isfinite(I):
+                    I = iph
+                elif I > 0.0:
+                    out[r, j] += I
+                else:
+                    break  # past this cell's Voc: negative at every higher V
+    return out, steps
+
+
+def string_current_jit(V, Iph, I0, Rs, Rsh, n, Vt, xtol=1e-8, max_iter=100):
+    """
+    string_current for large blocks (annual chunks): same equation and
+    tolerance, solved per element in compiled code instead of as whole
+    numpy arrays, which are memory bound at that size. Rs / Rsh scalar.
+    """
+    Iph = np.asarray(Iph, float)
+    lead = Iph.shape[:-1]
+    n_cells = Iph.shape[-1]
+    I0 = np.broadcast_to(np.asarray(I0, float), Iph.shape).reshape(-1, n_cells)
+    nVt = np.broadcast_to(n * np.asarray(Vt, float), lead).reshape(-1)
+    out, steps = _string_current_kernel(
+        np.ascontiguousarray(V, dtype=float),
+        np.ascontiguousarray(Iph.reshape(-1, n_cells)),
+        np.ascontiguousarray(I0),
+        float(Rs), float(Rsh),
+        np.ascontiguousarray(nVt, dtype=float),
+        float(xtol), int(max_iter),
+    )
+    record_solver("jit", steps, I0.size * len(V))
+    return out.reshape(lead + (len(V),))
+
+
+@njit(cache=True)
+def _cell_current(v, I, iph, i0, rs, g, inv, xtol, max_iter):
+    # same Newton as _string_current_kernel, from a start at or above the root
+    steps = 0
+    for _ in range(max_iter):
+        steps += 1
+        x = v + I * rs
+        e = i0 * np.exp(x * inv)
+        step = (I - iph + e - i0 + x * g) / (1.0 + (e * inv + g) * rs)
+        I -= step
+        if abs(step) <= xtol * (abs(I) + xtol):
+            break
+    return I, steps
+
+
+@njit(cache=True)
+def _cell_voc(iph, i0, g, inv, xtol, max_iter):
+    # V where the cell current reaches 0 (Rs carries no current there).
+    # Starts at the Voc without the shunt, above the root; the residual is
+    # concave and decreasing in V, so Newton descends onto it monotonically.
+    if iph <= 0.0:
+        return 0.0
+    v = np.log(iph / i0 + 1.0) / inv
+    for _ in range(max_iter):
+        e = i0 * np.exp(v * inv)
+        step = (iph - e + i0 - v * g) / (-e * inv - g)
+        v -= step
+        if abs(step) <= xtol * (abs(v) + xtol):
+            break
+    return v
+
+
+@njit(cache=True)
+def _string_mpp_kernel(Iph, I0, Rs, Rsh, nVt, v_max, vtol, xtol, max_iter):
+    m, n_cells = Iph.shape
+    out = np.zeros((m, 3))  # Isc, Vmp, Imp
+    I = np.empty(n_cells)
+    I_lo = np.empty(n_cells)
+    steps = 0
+    evals = 0
+    for r in range(m):
+        inv = 1.0 / nVt[r]
+
+        # 1) breakpoints: 0, v_max and every cell Voc in between. Between
+        #    two of them the set of conducting cells is fixed and each I(V)
+        #    is concave, so P(V) has at most one maximum per segment.
+        bp = np.empty(n_cells + 2)
+        bp[0] = 0.0
+        n_bp = 1
+        for c in range(n_cells):
+            voc = _cell_voc(Iph[r, c], I0[r, c], 1.0 / Rsh[r, c], inv, xtol, max_iter)
+            if 0.0 < voc < v_max:
+                bp[n_bp] = voc
+                n_bp += 1
+        bp[n_bp] = v_max
+        n_bp += 1
+        bp = np.sort(bp[:n_bp])
+
+        # 2) currents at the breakpoints, warm-started upwards in V
+        I_bp = np.empty((n_bp, n_cells))
+        tot_bp = np.zeros(n_bp)
+        for c in range(n_cells):
+            I[c] = Iph[r, c]
+        best_p = -1.0
+        for k in range(n_bp):
+            tot = 0.0
+            for c in range(n_cells):
+                i, s = _cell_current(bp[k], I[c], Iph[r, c], I0[r, c], Rs[r, c],
+                                     1.0 / Rsh[r, c], inv, xtol, max_iter)
+                steps += s
+                if not np.isfinite(i):
+                    i = Iph[r, c]
+                elif i > 0.0:
+                    tot += i
+                I[c] = i
+                I_bp[k, c] = i
+            evals += n_cells
+            tot_bp[k] = tot
+            if tot * bp[k] > best_p:
+                best_p = tot * bp[k]
+                out[r, 1] = bp[k]
+                out[r, 2] = tot
+        out[r, 0] = tot_bp[0]
+
+        # 3) per segment, bisection on the sign of dP/dV = I + V dI/dV.
+        #    I(V) decreases, so bp[k+1] * I(bp[k]) bounds P on the segment:
+        #    the most promising segments go first, the rest are skipped.
+        bound = bp[1:] * tot_bp[:-1]
+        for k in np.argsort(-bound):
+            if bound[k] <= best_p:
+                break
+            lo, hi = bp[k], bp[k + 1]
+            for c in range(n_cells):
+                I_lo[c] = I_bp[k, c]
+            while hi - lo > vtol:
+                mid = 0.5 * (lo + hi)
+                tot = 0.0
+                slope = 0.0
+                for c in range(n_cells):
+                    rs, g = Rs[r, c], 1.0 / Rsh[r, c]
+                    # I(lo) >= I(mid): the warm start stays above the root
+                    i, s = _cell_current(mid, I_lo[c], Iph[r, c], I0[r, c], rs, g,
+                                         inv, xtol, max_iter)
+                    steps += s
+                    if not np.isfinite(i):
+                        i = Iph[r, c]
+                    elif i > 0.0:
+                        e = I0[r, c] * np.exp((mid + i * rs) * inv) * inv
+                        tot += i
+                        slope -= (e + g) / (1.0 + (e + g) * rs)
+                    I[c] = i
+                evals += n_cells
+                if tot + mid * slope > 0.0:
+                    lo = mid
+                    for c in range(n_cells):
+                        I_lo[c] = I[c]
+                else:
+                    hi = mid
+
+            vmp = 0.5 * (lo + hi)
+            tot = 0.0
+            for c in range(n_cells):
+                i, s = _cell_current(vmp, I_lo[c], Iph[r, c], I0[r, c], Rs[r, c],
+                                     1.0 / Rsh[r, c], inv, xtol, max_iter)
+                steps += s
+                if np.isfinite(i) and i > 0.0:
+                    tot += i
+            evals += n_cells
+            if tot * vmp > best_p:
+                best_p = tot * vmp
+                out[r, 1] = vmp
+                out[r, 2] = tot
+    return out, steps, evals
+
+
+def string_mpp(Iph, I0, Rs, Rsh, n, Vt, v_max, vtol=MPP_VTOL, xtol=1e-8, max_iter=100):
+    """
+    Maximum power point of the string_current curve P(V) = V * I(V) on
+    [0, v_max] without a dense voltage grid.
+
+    The cell open-circuit voltages split [0, v_max] into segments on which
+    the set of conducting cells is fixed and P(V) is concave. On each
+    segment that could still beat the best point so far, bisection on the
+    sign of dP/dV (dI/dV from the implicit diode equation) finds its
+    maximum to `vtol` volts. That gives the global maximum even when
+    mismatched cells make P(V) multi-peaked, in a few dozen solves per row
+    instead of one per grid point. Same inputs as string_current_jit,
+    except Rs / Rsh may also be per cell.
+
+    Returns (Isc, Vmp, Imp), each shaped like Iph without its cell axis.
+    """
+    Iph = np.asarray(Iph, float)
+    lead = Iph.shape[:-1]
+    n_cells = Iph.shape[-1]
+    flat = lambda a: np.ascontiguousarray(
+        np.broadcast_to(np.asarray(a, float), Iph.shape).reshape(-1, n_cells))
+    nVt = np.broadcast_to(n * np.asarray(Vt, float), lead).reshape(-1)
+    out, steps, evals = _string_mpp_kernel(
+        flat(Iph), flat(I0), flat(Rs), flat(Rsh),
+        np.ascontiguousarray(nVt, dtype=float),
+        float(v_max), float(vtol), float(xtol), int(max_iter),
+    )
+    record_solver("jit_mpp", steps, evals)
+    Isc, Vmp, Imp = (out[:, k].reshape(lead) for k in range(3))
+    return Isc, Vmp, Imp
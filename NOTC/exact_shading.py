@@ -0,0 +1,105 @@
+import numpy as np
+from numba import njit
+
+SHADING_MODES = ("sampled", "exact", "table")
+
+
+def check_shading_mode(shading):
+    if shading not in SHADING_MODES:
+        raise ValueError(f"shading must be one of {SHADING_MODES}, got {shading!r}")
+    return shading
+
+
+@njit(cache=True)
+def exact_direct_fractions(Ax, Az, Bx, Bz, rx, rz):
+    """
+    Exact sunlit fraction of every segment A->B under a parallel light
+    source, (rx, rz) being the unit direction from the cells towards the sun.
+
+    Each segment is projected onto the axis perpendicular to the ray
+    (u = r x p) and onto the ray itself (depth d = r . p). A point of cell i
+    is shaded by segment j when j covers the same u and lies deeper towards
+    the sun. Both depths are linear in u, so each j shades one interval of
+    cell i; the union of those intervals is the shaded fraction.
+    """
+    n = Ax.shape[0]
+    uA = rx * Az - rz * Ax
+    uB = rx * Bz - rz * Bx
+    dA = rx * Ax + rz * Az
+    dB = rx * Bx + rz * Bz
+
+    frac = np.ones(n)
+    lo = np.empty(n)
+    hi = np.empty(n)
+
+    for i in range(n):
+        du_i = uB[i] - uA[i]
+        edge_on = abs(du_i) < 1e-12
+        m = 0
+
+        for j in range(n):
+            if j == i:
+                continue
+            du_j = uB[j] - uA[j]
+            if abs(du_j) < 1e-12:
+                continue  # parallel to the ray: casts no shadow
+
+            if edge_on:
+                # whole cell sits at one u; test its midpoint
+                w = (uA[i] - uA[j]) / du_j
+                if 0.0 <= w <= 1.0:
+                    d_j = dA[j] + w * (dB[j] - dA[j])
+                    if d_j - 0.5 * (dA[i] + dB[i]) > 1e-9:
+                        frac[i] = 0.0
+                        break
+                continue
+
+            # t-range of cell i that faces segment j
+            t1 = (uA[j] - uA[i]) / du_i
+            t2 = (uB[j] - uA[i]) / du_i
+            if t1 > t2:
+                t1, t2 = t2, t1
+            t1 = max(t1, 0.0)
+            t2 = min(t2, 1.0)
+            if t2 <= t1:
+                continue
+
+            # depth of j minus depth of i, linear in t
+            g1 = (dA[j] + ((uA[i] + t1 * du_i) - uA[j]) / du_j * (dB[j] - dA[j])
+                  - (dA[i] + t1 * (dB[i] - dA[i])))
+            g2 = (dA[j] + ((uA[i] + t2 * du_i) - uA[j]) / du_j * (dB[j] - dA[j])
+                  - (dA[i] + t2 * (dB[i] - dA[i])))
+
+            if g1 > 0.0 and g2 > 0.0:
+                a, b = t1, t2
+            elif g1 <= 0.0 and g2 <= 0.0:
+                continue
+            else:
+                tc = t1 + (t2 - t1) * g1 / (g1 - g2)
+                if g1 > 0.0:
+                    a, b = t1, tc
+                else:
+                    a, b = tc, t2
+            lo[m] = a
+            hi[m] = b
+            m += 1
+
+        if edge_on or m == 0:
+            continue
+
+        order = np.argsort(lo[:m])
+        shaded = 0.0
+        cur_lo = lo[order[0]]
+        cur_hi = hi[order[0]]
+        for k in range(1, m):
+            a = lo[order[k]]
+            b = hi[order[k]]
+            if a > cur_hi:
+                shaded += cur_hi - cur_lo
+                cur_lo, cur_hi = a, b
+            elif b > cur_hi:
+                cur_hi = b
+        shaded += cur_hi - cur_lo
+        frac[i] = max(1.0 - shaded, 0.0)
+
+    return frac
@@ -0,0 +1,312 @@
+"""
+Module geometry registry.
+
+A design is the 2D cross-section of a module: one straight segment per
+cell in the (x, y) plane of the untilted module, the active cell length
+along it, the cell depth (into the page) and whether the cell's rear face
+picks up ground albedo or sky diffuse. Designs live as JSON files in the
+design directory, one per file, named <id>.json:
+
+    {
+      "id": "pixolar",
+      "name": "Pixolar 8-cell cross-section",
+      "cell_depth_mm": 182.0,
+      "cells": [
+        {"name": "C8", "top": {"x": 0.0, "y": 113.91}, "bottom": {"x": 0.0, "y": 1.31},
+         "length_mm": 112.6, "rear": "albedo"},
+        ...
+      ]
+    }
+
+Every design is validated on load and gets a version hash over its
+geometry, which the shading cache, the shading table and the result cache
+key on. The rotated segment endpoints and normals are precomputed once per
+design on TILT_GRID; the shading kernels take them as input instead of
+rotating the cross-section on every call.
+
+Configuration (environment):
+    NOTC_DESIGN_DIR   design directory (default NOTC/data/designs)
+    NOTC_DESIGN       default design id, default "pixolar"
+"""
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+
+import numpy as np
+from numba import njit
+
+logger = logging.getLogger(__name__)
+
+DESIGN_DIR = os.getenv(
+    "NOTC_DESIGN_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "designs"),
+)
+DEFAULT_DESIGN_ID = os.getenv("NOTC_DESIGN", "pixolar")
+
+REAR_MODES = ("albedo", "diffuse")
+MAX_CELLS = 64
+DESIGN_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+# precomputed tilts (deg); exact multiples of the step, so a grid hit is bit-identical
+TILT_GRID_STEP = 0.5
+TILT_GRID = np.arange(0, 201) * TILT_GRID_STEP
+
+# rows of a rotated segment block, each (n_cells,)
+SEGMENT_ROWS = ("Ax", "Az", "Bx", "Bz", "nx", "nz")
+
+
+class DesignError(ValueError):
+    pass
+
+
+@njit(cache=True)
+def rotate_cells(cells, tilt_deg):
+    """
+    Segment endpoints (A = top, B = bottom) and unit normals of every cell
+    after tilting the cross-section by tilt_deg. Returns a (6, n) block in
+    SEGMENT_ROWS order.
+    """
+    th = math.radians(tilt_deg)
+    c, s = math.cos(th), math.sin(th)
+    n = cells.shape[0]
+    out = np.empty((6, n))
+    for i in range(n):
+        Yt, Xt, Yb, Xb = cells[i, 0], cells[i, 1], cells[i, 2], cells[i, 3]
+        ax, az = c*Xt - s*Yt, s*Xt + c*Yt
+        bx, bz = c*Xb - s*Yb, s*Xb + c*Yb
+
+        dx, dz = bx - ax, bz - az
+        L = math.sqrt(dx*dx + dz*dz) + 1e-12
+        out[0, i], out[1, i], out[2, i], out[3, i] = ax, az, bx, bz
+        out[4, i], out[5, i] = -(dz/L), (dx/L)
+    return out
+
+
+class ModuleDesign:
+    """
+    A validated cross-section. `cells` is the kernel layout, one row per
+    cell: (y_top, x_top, y_bottom, x_bottom, length_mm).
+    """
+
+    def __init__(self, design_id, name, cells, cell_names, rear, cell_depth_mm, source=None):
+        self.id = design_id
+        self.name = name
+        self.cells = np.ascontiguousarray(cells, dtype=float)
+        self.cell_names = list(cell_names)
+        self.keep_albedo = [r == "albedo" for r in rear]
+        self.cell_depth_mm = float(cell_depth_mm)
+        self.source = source
+
+        self.area_mm2 = self.cells[:, 4] * self.cell_depth_mm
+        self.rear_area_mm2 = np.where(self.keep_albedo, self.area_mm2, 0)
+        self.rear_area_2_mm2 = np.where(~np.array(self.keep_albedo), self.area_mm2, 0)
+        for a in (self.cells, self.area_mm2, self.rear_area_mm2, self.rear_area_2_mm2):
+            a.flags.writeable = False
+
+        self.version = hashlib.sha1(
+            self.cells.tobytes()
+            + repr((self.cell_names, self.keep_albedo, self.cell_depth_mm)).encode()
+        ).hexdigest()[:12]
+
+        self._grid = None
+        self._by_tilt = None
+        self._lock = threading.Lock()
+
+    @property
+    def n_cells(self):
+        return len(self.cell_names)
+
+    def _tilt_grid(self):
+        if self._grid is None:
+            with self._lock:
+                if self._grid is None:
+                    grid = np.stack([rotate_cells(self.cells, t) for t in TILT_GRID])
+                    grid.flags.writeable = False
+                    self._by_tilt = {float(t): grid[k] for k, t in enumerate(TILT_GRID)}
+                    self._grid = grid
+        return self._grid
+
+    def segment_block(self, tilt_deg):
+        """Rotated (6, n) block for one tilt; from the grid when it is on it."""
+        self._tilt_grid()
+        block = self._by_tilt.get(float(tilt_deg))
+        return block if block is not None else rotate_cells(self.cells, float(tilt_deg))
+
+    def segments(self, tilts):
+        """Rotated blocks for several tilts, (n_tilts, 6, n) C-contiguous."""
+        grid = self._tilt_grid()
+        tilts = np.atleast_1d(np.asarray(tilts, float))
+        k = np.rint(tilts / TILT_GRID_STEP).astype(int)
+        on_grid = (k >= 0) & (k < TILT_GRID.size)
+        on_grid &= TILT_GRID[np.clip(k, 0, TILT_GRID.size - 1)] == tilts
+        if on_grid.all():
+            return np.ascontiguousarray(grid[k])
+        out = np.empty((tilts.size, 6, self.n_cells))
+        for j, t in enumerate(tilts):
+            out[j] = grid[k[j]] if on_grid[j] else rotate_cells(self.cells, t)
+        return out
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "version": self.version,
+            "cell_depth_mm": self.cell_depth_mm,
+            "cells": [
+                {
+                    "name": name,
+                    "top": {"x": float(row[1]), "y": float(row[0])},
+                    "bottom": {"x": float(row[3]), "y": float(row[2])},
+                    "length_mm": float(row[4]),
+                    "rear": "albedo" if keep else "diffuse",
+                }
+                for name, row, keep in zip(self.cell_names, self.cells, self.keep_albedo)
+            ],
+        }
+
+
+# ------------------------------------------------------------------
+# LOADING / VALIDATION
+# ------------------------------------------------------------------
+def _number(value, where):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise DesignError(f"{where} must be a finite number, got {value!r}")
+    return float(value)
+
+
+def _point(value, where):
+    if not isinstance(value, dict):
+        raise DesignError(f"{where} must be an object with x and y")
+    return _number(value.get("x"), f"{where}.x"), _number(value.get("y"), f"{where}.y")
+
+
+def design_from_dict(doc, source="<dict>"):
+    """Validate a design document and build the ModuleDesign."""
+    if not isinstance(doc, dict):
+        raise DesignError(f"{source}: design must be a JSON object")
+    design_id = doc.get("id")
+    if not isinstance(design_id, str) or not DESIGN_ID_RE.match(design_id):
+        raise DesignError(f"{source}: id must match {DESIGN_ID_RE.pattern}, got {design_id!r}")
+    depth = _number(doc.get("cell_depth_mm"), f"{source}: cell_depth_mm")
+    if depth <= 0:
+        raise DesignError(f"{source}: cell_depth_mm must be > 0")
+
+    cells = doc.get("cells")
+    if not isinstance(cells, list) or not 1 <= len(cells) <= MAX_CELLS:
+        raise DesignError(f"{source}: cells must be a list of 1..{MAX_CELLS} cells")
+
+    rows, names, rear = [], [], []
+    for k, cell in enumerate(cells):
+        where = f"{source}: cells[{k}]"
+        if not isinstance(cell, dict):
+            raise DesignError(f"{where} must be an object")
+        name = cell.get("name")
+        if not isinstance(name, str) or not name:
+            raise DesignError(f"{where}.name must be a non-empty string")
+        if name in names:
+            raise DesignError(f"{where}.name {name!r} is not unique")
+        xt, yt = _point(cell.get("top"), f"{where}.top")
+        xb, yb = _point(cell.get("bottom"), f"{where}.bottom")
+        segment = math.hypot(xb - xt, yb - yt)
+        if segment <= 0:
+            raise DesignError(f"{where}: top and bottom coincide")
+        length = _number(cell.get("length_mm"), f"{where}.length_mm")
+        # the active length may be shorter than the mounted segment, never longer
+        if not 0 < length <= 1.05 * segment:
+            raise DesignError(
+                f"{where}.length_mm must be in (0, {1.05 * segment:.2f}] for its segment, got {length}"
+            )
+        if cell.get("rear") not in REAR_MODES:
+            raise DesignError(f"{where}.rear must be one of {REAR_MODES}")
+        rows.append((yt, xt, yb, xb, length))
+        names.append(name)
+        rear.append(cell["rear"])
+
+    return ModuleDesign(design_id, str(doc.get("name") or design_id), np.array(rows), names,
+                        rear, depth, source=source)
+
+
+def load_design(path):
+    with open(path) as f:
+        try:
+            doc = json.load(f)
+        except json.JSONDecodeError as e:
+            raise DesignError(f"{path}: invalid JSON ({e})") from None
+    design = design_from_dict(doc, path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if design.id != stem:
+        raise DesignError(f"{path}: id {design.id!r} does not match the file name")
+    return design
+
+
+# ------------------------------------------------------------------
+# REGISTRY
+# ------------------------------------------------------------------
+class DesignRegistry:
+    """
+    Designs found in one directory, loaded on first use. An invalid file
+    is logged and left out (see `errors`) instead of taking the others down.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._designs = None
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def _loaded(self):
+        if self._designs is None:
+            with self._lock:
+                if self._designs is None:
+                    designs, errors = {}, {}
+                    for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+                        try:
+                            d = load_design(path)
+                        except (DesignError, OSError) as e:
+                            errors[os.path.basename(path)] = str(e)
+                            logger.error("skipping module design: %s", e)
+                            continue
+                        designs[d.id] = d
+                    self.errors = errors
+                    self._designs = designs
+        return self._designs
+
+    def get(self, design_id):
+        design = self._loaded().get(design_id)
+        if design is None:
+            raise DesignError(f"unknown design {design_id!r}; available: {self.ids()}")
+        return design
+
+    def ids(self):
+        return sorted(self._loaded())
+
+    def all(self):
+        return [self._loaded()[k] for k in self.ids()]
+
+    def register(self, design):
+        """Add a design built in code (design_from_dict) to this registry."""
+        designs = self._loaded()
+        with self._lock:
+            designs[design.id] = design
+        return design
+
+    def reload(self):
+        with self._lock:
+            self._designs = None
+        return self.ids()
+
+
+# process-wide registry
+DESIGNS = DesignRegistry(DESIGN_DIR)
+
+
+def get_design(design=None):
+    """A ModuleDesign from an id, an existing design, or None for the default."""
+    if isinstance(design, ModuleDesign):
+        return design
+    return DESIGNS.get(design or DEFAULT_DESIGN_ID)
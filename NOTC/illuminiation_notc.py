@@ -1,19 +1,24 @@
-
-import pandas as pd
 import numpy as np
 
-def apply_notc_irradiacne(area, dni, dhi,ghi,alpha_rear):
-    cosi = area["Cosine"].to_numpy(float)
-    n = len(area)
+from NOTC.cell_state import CellState
+from NOTC.instrumentation import timed
+
 
-    return pd.DataFrame({
-        "Cell": area["Cell"].to_numpy(),
+@timed("illumination")
+def cell_irradiance(cells, dni, dhi, ghi, alpha_rear):
+    """Fill a CellState's per-cell irradiance in place and return it."""
+    n = len(cells.names)
 
-        # Front
-        "Direct_Wm2": dni * cosi,
-        "Shaded_Wm2": np.full(n, dhi),
+    # Front
+    cells.direct_wm2 = dni * cells.cosine
+    cells.shaded_wm2 = np.full(n, dhi)
 
-        # Rear: orientation-aware diffuse pickup
-        "Rear_Wm2":  alpha_rear*ghi,
-        "Rear2_Wm2": dhi,
-    })
\ No newline at end of file
+    # Rear: orientation-aware diffuse pickup
+    cells.rear_wm2 = np.full(n, alpha_rear * ghi)
+    cells.rear2_wm2 = np.full(n, dhi)
+    return cells
+
+
+@timed("illumination")
+def apply_notc_irradiacne(area, dni, dhi,ghi,alpha_rear):
+    return cell_irradiance(CellState.from_frames(area), dni, dhi, ghi, alpha_rear).illumination_frame()
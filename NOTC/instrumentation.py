@@ -0,0 +1,216 @@
+"""
+In-process metrics for the simulation pipeline.
+
+Stage timers (weather, solar position, shading, illumination, Bishop
+solves), counters (cache requests, solver iterations, HTTP requests) and
+scrape-time collectors for caches that keep their own numbers. Everything
+is rendered in the Prometheus text format by GET /api/metrics.
+
+Recording is a perf_counter pair and a locked dict update, so it can sit
+in per-timestamp code. Metrics are per process: simulations that run in
+the job / batch process pools are not seen by the web worker's endpoint.
+
+    with stage("shading"):
+        ...
+
+    @timed("bishop_3d")
+    def bishop2(...):
+        ...
+
+Nested use of the same stage (a timed function calling another one timed
+under the same name) is only counted once, by the outermost timer.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# seconds; per-call stages run from ~100 us (illumination) to seconds (full-year chunks)
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# bytes; response bodies run from a few hundred bytes to tens of MB (full-year rows)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+FAMILIES = {
+    "notc_stage_seconds": ("histogram", "Wall time of one simulation pipeline stage."),
+    "notc_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)."),
+    "notc_cache_hit_ratio": ("gauge", "Hits / lookups per cache since process start."),
+    "notc_cache_entries": ("gauge", "Entries currently held per cache."),
+    "notc_cache_evictions_total": ("counter", "Entries evicted per cache."),
+    "notc_solver_calls_total": ("counter", "Diode solver calls by solver."),
+    "notc_solver_iterations_total": ("counter",
+                                     "Newton iterations by solver (numpy: whole-array sweeps, "
+                                     "jit: per-element steps)."),
+    "notc_solver_elements_total": ("counter", "Cell x voltage points solved by solver."),
+    "notc_weather_requests_total": ("counter", "TMY lookups by resulting source."),
+    "notc_http_requests_total": ("counter", "Handled API requests by endpoint and status."),
+    "notc_http_request_seconds": ("histogram",
+                                  "API handler time by endpoint (streamed bodies excluded)."),
+    "notc_response_encode_seconds": ("histogram",
+                                     "Serialization + compression time of a response body by format."),
+    "notc_response_bytes": ("histogram", "Response body size on the wire by format and encoding."),
+}
+
+# histogram families not measured in seconds
+FAMILY_BUCKETS = {"notc_response_bytes": SIZE_BUCKETS}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        buckets = FAMILY_BUCKETS.get(name, BUCKETS)
+        i = bisect_left(buckets, value)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            h[i] += 1
+            h[-1] += value
+
+    def register_collector(self, fn):
+        """fn() -> iterable of (name, labels dict, value), called at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def samples(self):
+        """Counter / gauge samples: {name: [(labels tuple, value)]}."""
+        with self._lock:
+            counters = dict(self._counters)
+        out = {}
+        for (name, labels), value in counters.items():
+            out.setdefault(name, []).append((labels, value))
+        for fn in self._collectors:
+            try:
+                for name, labels, value in fn():
+                    out.setdefault(name, []).append((tuple(sorted(labels.items())), value))
+            except Exception:
+                continue  # a broken collector must not break the scrape
+        return out
+
+    def render(self):
+        samples = self.samples()
+        samples.setdefault("notc_cache_hit_ratio", []).extend(_hit_ratios(samples))
+        with self._lock:
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        lines = []
+        for name in sorted(set(samples) | {n for n, _ in histograms}):
+            kind, help_text = FAMILIES.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(samples.get(name, ())):
+                lines.append(f"{name}{_labels(labels)} {_num(value)}")
+            for (h_name, labels), h in sorted(histograms.items()):
+                if h_name != name:
+                    continue
+                cumulative = 0
+                buckets = FAMILY_BUCKETS.get(name, BUCKETS)
+                for bound, count in zip(buckets + (float("inf"),), h[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _num(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(h[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _hit_ratios(samples):
+    totals = {}
+    for labels, value in samples.get("notc_cache_requests_total", ()):
+        d = dict(labels)
+        hits, n = totals.get(d["cache"], (0, 0))
+        totals[d["cache"]] = (hits + (value if d["result"] == "hit" else 0), n + value)
+    return [((("cache", c),), hits / n if n else 0.0) for c, (hits, n) in totals.items()]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + body + "}"
+
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# process-wide registry
+METRICS = Metrics()
+_active = threading.local()
+
+
+def inc(name, value=1, **labels):
+    METRICS.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    METRICS.observe(name, value, **labels)
+
+
+@contextmanager
+def stage(name):
+    active = getattr(_active, "stages", None)
+    if active is None:
+        active = _active.stages = set()
+    if name in active:
+        yield
+        return
+    active.add(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe("notc_stage_seconds", time.perf_counter() - t0, stage=name)
+        active.discard(name)
+
+
+def timed(name):
+    """Decorator form of stage(name)."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def cache_counts(cache, hits, misses):
+    """Collector rows for a cache that keeps its own hit / miss counters."""
+    return [
+        ("notc_cache_requests_total", {"cache": cache, "result": "hit"}, hits),
+        ("notc_cache_requests_total", {"cache": cache, "result": "miss"}, misses),
+    ]
+
+
+def record_cache(cache, hit):
+    METRICS.inc("notc_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_solver(solver, iterations, elements):
+    METRICS.inc("notc_solver_calls_total", solver=solver)
+    METRICS.inc("notc_solver_iterations_total", int(iterations), solver=solver)
+    METRICS.inc("notc_solver_elements_total", int(elements), solver=solver)
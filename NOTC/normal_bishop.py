@@ -1,13 +1,22 @@
+import logging
 import numpy as np
-from scipy.optimize import fsolve
 from typing import Dict
 import pandas as pd
 
+from NOTC.diode_solver import string_current, string_mpp
+from NOTC.instrumentation import timed
 
+logger = logging.getLogger(__name__)
 
 
-def bishop_module1_performance(avg_wm2: float, temp_c: float,dni, n_cells: int = 5):
-    """Module 1 performance with number of series cells for monthly energy calculation."""
+
+
+@timed("bishop_2d")
+def bishop_module1_performance(avg_wm2: float, temp_c: float,dni, n_cells: int = 5, mpp: str = "grid"):
+    """
+    Module 1 performance with number of series cells for monthly energy calculation.
+    mpp="exact" finds Vmp / Imp with string_mpp instead of the 500-point grid.
+    """
 
     T_cell = temp_c + (43 - 20) * (dni / 800)
 
@@ -26,7 +35,7 @@ def bishop_module1_performance(avg_wm2: float, temp_c: float,dni, n_cells: int =
     for cell, area_cm2 in cells.items():
         G = G_full
         Iph = Jph1000 * (G / 1000.0) * area_cm2
-        print('2D IPH',Iph)
+        logger.debug("2D Iph=%.6g G=%.1f T_cell=%.2f", Iph, G, T_cell)
         Rs = 0.0062
         Rsh = 2082
         I0 = 1e-12 * area_cm2
@@ -35,27 +44,28 @@ def bishop_module1_performance(avg_wm2: float, temp_c: float,dni, n_cells: int =
         Rsh_segments.append(Rsh)
         I0_segments.append(I0)
 
-    V = np.linspace(0, 0.763, 500)
-    I_total = []
-
-    def diode_eq(I, V, Iph, I0, Rs, Rsh, n, Vt):
-        return I - (Iph - I0 * (np.exp((V + I * Rs) / (n * Vt)) - 1.0) - (V + I * Rs) / Rsh)
-
-    for v in V:
-        I_cells = []
-        for Iph, I0, Rs, Rsh in zip(Iph_segments, I0_segments, Rs_segments, Rsh_segments):
-            guess = Iph
-            I_sol = fsolve(diode_eq, guess, args=(v, Iph, I0, Rs, Rsh, n, Vt))[0]
-            I_cells.append(max(float(I_sol), 0.0))
-        I_total.append(sum(I_cells))
-
-    I_total = np.array(I_total)
-    P = V * I_total
-    Pmax = float(np.max(P))
-    idx = int(np.argmax(P))
-    Vmp, Imp = float(V[idx]), float(I_total[idx])
-    Isc = float(I_total[0])
     Voc = 0.763
+    segments = (
+        np.array(Iph_segments),
+        np.array(I0_segments),
+        np.array(Rs_segments),
+        np.array(Rsh_segments),
+        n,
+        Vt,
+    )
+    if mpp == "exact":
+        Isc, Vmp, Imp = (float(x) for x in string_mpp(*segments, Voc, xtol=1.49012e-08))
+        Pmax = Vmp * Imp
+    else:
+        V = np.linspace(0, Voc, 500)
+
+        # Batched solve: all segments x all voltage points at once
+        I_total = string_current(V, *segments, xtol=1.49012e-08)
+        P = V * I_total
+        Pmax = float(np.max(P))
+        idx = int(np.argmax(P))
+        Vmp, Imp = float(V[idx]), float(I_total[idx])
+        Isc = float(I_total[0])
     FF = (Vmp * Imp) / (Voc * Isc) if (Voc * Isc) > 0 else 0.0
 
     ## series values:
@@ -69,4 +79,56 @@ def bishop_module1_performance(avg_wm2: float, temp_c: float,dni, n_cells: int =
     return {"Isc": round(Isc, 2),"Imp": round(Imp, 2),
              "Pmax": round(Pmax, 4), "FF": round(FF, 4),
             "Pmax_series": round(Pmax_series, 4),
-            "Vmp_series": round(Vmp_series, 4), "Voc_series": round(Voc_series, 4), "FF_series": round(FF_series, 2)}
\ No newline at end of file
+            "Vmp_series": round(Vmp_series, 4), "Voc_series": round(Voc_series, 4), "FF_series": round(FF_series, 2)}
+
+@timed("bishop_2d")
+def bishop_module1_arrays(avg_wm2, temp_c, dni, n_cells: int = 5, mpp: str = "grid"):
+    """
+    bishop_module1_performance for arrays of timestamps in one solve.
+    Returns the same (rounded) keys as (n_t,) arrays.
+    """
+    avg_wm2, temp_c, dni = (np.asarray(x, float) for x in (avg_wm2, temp_c, dni))
+    T_cell = temp_c + (43 - 20) * (dni / 800)
+
+    q = 1.602e-19
+    k = 1.381e-23
+    T = T_cell + 273.15
+    Vt = k * T / q
+    n = 1.2
+    ref_cm2 = (182 * 182) / 100.0
+    Jph1000 = 13.857 / ref_cm2
+
+    area_cm2 = (182 * 182) / 100.0
+    G = np.maximum(avg_wm2, 1.0)
+    Iph = Jph1000 * (G / 1000.0) * area_cm2
+    I0 = 1e-12 * area_cm2
+
+    Voc = 0.763
+    segments = (Iph[:, None], np.array([I0]), np.array([0.0062]), np.array([2082.0]), n, Vt)
+    if mpp == "exact":
+        Isc, Vmp, Imp = string_mpp(*segments, Voc, xtol=1.49012e-08)
+        Pmax = Vmp * Imp
+    else:
+        V = np.linspace(0, Voc, 500)
+        I_total = string_current(V, *segments, xtol=1.49012e-08)
+        P = V * I_total
+        idx = np.argmax(P, axis=-1)
+        rows = np.arange(len(idx))
+        Pmax = P[rows, idx]
+        Vmp, Imp = V[idx], I_total[rows, idx]
+        Isc = I_total[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        FF = np.where(Voc * Isc > 0, (Vmp * Imp) / (Voc * Isc), 0.0)
+
+    Voc_series = Voc * n_cells
+    Vmp_series = Vmp * n_cells
+    Pmax_series = Vmp_series * Imp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        FF_series = Pmax_series / (Isc * Voc_series)
+
+    return {"Isc": np.round(Isc, 2), "Imp": np.round(Imp, 2),
+            "Pmax": np.round(Pmax, 4), "FF": np.round(FF, 4),
+            "Pmax_series": np.round(Pmax_series, 4),
+            "Vmp_series": np.round(Vmp_series, 4),
+            "Voc_series": np.full_like(Isc, round(Voc_series, 4)),
+            "FF_series": np.round(FF_series, 2)}
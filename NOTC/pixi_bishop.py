@@ -1,11 +1,26 @@
-from scipy.optimize import fsolve
+import logging
 from typing import Dict
 import numpy as np
-import pandas as pd
 
+from NOTC.cell_state import CellState
+from NOTC.diode_solver import string_current, string_current_jit, string_mpp
+from NOTC.instrumentation import timed
 
+logger = logging.getLogger(__name__)
 
-def bishop2(area_df, illum,Temp,dni):
+
+
+@timed("bishop_3d")
+def bishop2(area_df, illum,Temp,dni,mpp="grid"):
+    return bishop2_cells(CellState.from_frames(area_df, illum), Temp, dni, mpp)
+
+
+@timed("bishop_3d")
+def bishop2_cells(cells, Temp, dni, mpp="grid"):
+    """
+    bishop2 on a CellState with irradiance set (see cell_irradiance).
+    mpp="exact" replaces the 500-point voltage grid with string_mpp.
+    """
     T_cell=(Temp+10) + (43-20)* (dni/800)
     beta=0.7
     q=1.602e-19
@@ -18,75 +33,57 @@ def bishop2(area_df, illum,Temp,dni):
     ref_cm2=(182*182)/100.0
     Jph_1000=13.857/ref_cm2
 
-    mat = pd.merge(area_df, illum, on="Cell", how="inner")
-
-    Iph_map={}
-    I0_map={}
-
-    print("\n--- PER-CELL INPUTS (bishop2) ---")
-    for _,r in mat.iterrows():
-        name=r["Cell"]
-        A=lambda k:float(r[k])/100.0
-
-        Ad, As, Ar, Ar2 = (
-            A("Direct_Area_mm2"),
-            A("Shaded_Area_mm2"),
-            A("Rear_Area_mm2"),
-            A("Rear_Area_2"),
+    # per-cell areas in cm2
+    Ad, As, Ar, Ar2 = (
+        cells.direct_area/100.0,
+        cells.shaded_area/100.0,
+        cells.rear_area/100.0,
+        cells.rear_area_2/100.0,
+    )
+
+    Gd, Gs, Gr, Gr2 = (
+        cells.direct_wm2,
+        cells.shaded_wm2,
+        cells.rear_wm2,
+        cells.rear2_wm2,
+    )
+
+    Iph = (
+            Jph_1000
+            * (
+                    Ad * (Gd / 1000)
+                    + As * (Gs / 1000)
+                    + beta * Ar * (Gr / 1000)
+                    + Ar2 * beta * (Gr2 / 1000)
+            )
+    )
+    area_cm2_total = Ad + As + Ar + Ar2
+    I0 = 1e-12 * np.maximum(area_cm2_total, 1e-6)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("bishop2 per-cell inputs T_cell=%.2f Iph=%s I0=%s", T_cell,
+                     dict(zip(cells.names, Iph)), dict(zip(cells.names, I0)))
+
+    if mpp == "exact":
+        Isc_single, Vmp_single, Imp_single = (
+            float(x) for x in string_mpp(Iph, I0, 0.015, 2282, n, Vt, Voc, xtol=1e-8)
         )
-
-        Gd, Gs, Gr, Gr2 = (
-            r["Direct_Wm2"],
-            r["Shaded_Wm2"],
-            r["Rear_Wm2"],
-            r["Rear2_Wm2"],
+    else:
+        # Batched solve: all cells x all voltage points at once
+        V=np.linspace(0,Voc,500)
+        I_total=string_current(
+            V,
+            Iph,
+            I0,
+            0.015,2282,n,Vt,
+            xtol=1e-8,
         )
-
-        Iph = (
-                Jph_1000
-                * (
-                        Ad * (Gd / 1000)
-                        + As * (Gs / 1000)
-                        + beta * Ar * (Gr / 1000)
-                        + Ar2 * beta * (Gr2 / 1000)
-                )
-                * 1
-        )
-        area_cm2_total = Ad + As + Ar + Ar2
-        I0 = 1e-12 * max(area_cm2_total, 1e-6)
-
-        Iph_map[name] = Iph
-        I0_map[name] = I0
-
-    V = np.linspace(0, Voc, 400)
-
-    # Continue solver (unchanged)
-    V=np.linspace(0,Voc,500)
-    def diode_eq(I, V, Iph, I0, Rs, Rsh):
-        return I - (Iph - I0*(np.exp((V + I*Rs)/(n*Vt)) - 1) - (V + I*Rs)/Rsh)
-
-    I_total=[]
-    for v in V:
-        row=[]
-        for name in Iph_map:
-            try:
-                I = fsolve(diode_eq, Iph_map[name],
-                           args=(v, Iph_map[name], I0_map[name], 0.015,2282),
-                           xtol=1e-8, maxfev=200)[0]
-                row.append(max(I,0))
-            except:
-                row.append(0)
-        I_total.append(sum(row))
-
-    I_total=np.array(I_total)
-    idx=int(np.argmax(I_total*V))
+        idx=int(np.argmax(I_total*V))
+        Isc_single, Imp_single, Vmp_single = float(I_total[0]), float(I_total[idx]), float(V[idx])
 
     # base single-cell outputs
-    Isc_single = float(I_total[0])
-    Imp_single = float(I_total[idx])
-    Vmp_single = float(V[idx])
-    Pmax_single = float(I_total[idx] * V[idx])
-    FF_single = float((V[idx] * I_total[idx]) / (Voc * I_total[0] if I_total[0] != 0 else 1e-12))
+    Pmax_single = float(Imp_single * Vmp_single)
+    FF_single = float((Vmp_single * Imp_single) / (Voc * Isc_single if Isc_single != 0 else 1e-12))
 
     # scale for series cells: Voc, Vmp and Pmax scaled up to represent cells in series
     Voc_scaled = float(Voc * 5)
@@ -101,3 +98,66 @@ def bishop2(area_df, illum,Temp,dni):
         "FF": FF_single,
         "Voc": Voc_scaled,
     }
+
+
+@timed("bishop_3d")
+def bishop2_arrays(frac, cos_i, dni, dhi, ghi, alpha_rear, Temp, design=None, mpp="grid"):
+    """
+    bishop2 for a whole block of (timestamp, tilt) pairs, straight from the
+    make_area_tensor outputs instead of per-call area / illumination frames.
+
+    frac, cos_i         : (n_t, n_tilts, n_cells)
+    dni, dhi, ghi, Temp : (n_t,)
+    Returns bishop2's keys as (n_t, n_tilts) arrays.
+    """
+    from NOTC.geometry import get_design
+    design = get_design(design)
+
+    dni, dhi, ghi, Temp = (np.asarray(x, float)[:, None, None] for x in (dni, dhi, ghi, Temp))
+    T_cell=(Temp+10) + (43-20)* (dni/800)
+    beta=0.7
+    q=1.602e-19
+    k=1.381e-23
+    T=T_cell+273.15
+
+    Vt=k*T/q
+    n=1.2
+    Voc=0.763
+    ref_cm2=(182*182)/100.0
+    Jph_1000=13.857/ref_cm2
+
+    # same per-cell areas as cell_areas, /100 like bishop2
+    A=design.area_mm2
+    Ad=frac*A/100.0
+    As=(1-frac)*A/100.0
+    Ar=design.rear_area_mm2/100.0
+    Ar2=design.rear_area_2_mm2/100.0
+
+    Iph = Jph_1000 * (
+        Ad * (dni*cos_i / 1000)
+        + As * (dhi / 1000)
+        + beta * Ar * (alpha_rear*ghi / 1000)
+        + Ar2 * beta * (dhi / 1000)
+    )
+    I0 = 1e-12 * np.maximum(Ad + As + Ar + Ar2, 1e-6)
+
+    if mpp == "exact":
+        Isc,Vmp,Imp=string_mpp(Iph,I0,0.015,2282,n,Vt[..., 0],Voc,xtol=1e-8)
+    else:
+        V=np.linspace(0,Voc,500)
+        I_total=string_current_jit(V,Iph,I0,0.015,2282,n,Vt[..., 0],xtol=1e-8)
+        idx=np.argmax(I_total*V,axis=-1)[..., None]
+
+        Isc=I_total[...,0]
+        Imp=np.take_along_axis(I_total,idx,axis=-1)[...,0]
+        Vmp=V[idx[...,0]]
+    denom=np.where(Isc!=0,Voc*Isc,1e-12)
+
+    return {
+        "Isc": Isc,
+        "Imp": Imp,
+        "Vmp": Vmp*5,
+        "Pmax": Imp*Vmp*5,
+        "FF": Vmp*Imp/denom,
+        "Voc": np.full_like(Isc,Voc*5),
+    }
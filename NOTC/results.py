@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+OUTPUT_FORMATS = ("rows", "columnar")
+
+# per-timestamp record layout shared by both runners (order = JSON order)
+RECORD_COLUMNS = [
+    "timestamp_local", "timestamp_utc", "month",
+    "zen", "azi", "dni", "dhi", "ghi", "T_ambient",
+    # 2D
+    "tilt_analytic_2D", "Isc_2D", "Voc_2D", "Imp_2D", "Vmp_2D", "Pmax_2D", "FF_2D",
+    # 3D
+    "tilt_optimal_3D", "Isc_3D", "Imp_3D", "Vmp_3D", "Voc_3D", "Pmax_3D", "FF_3D",
+]
+
+_MONTHLY_AVG = [
+    "Isc_2D", "Isc_3D", "Imp_2D", "Imp_3D", "Vmp_2D", "Vmp_3D",
+    "tilt_analytic_2D", "tilt_optimal_3D", "FF_2D", "FF_3D",
+]
+
+
+def check_output_format(output_format):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
+    return output_format
+
+
+def build_frame(t_local, t_utc, columns):
+    """
+    Columnar per-timestamp result. `columns` maps record keys to equal
+    length sequences for the simulated timestamps in t_local / t_utc.
+    """
+    t_local = pd.DatetimeIndex(t_local)
+    frame = pd.DataFrame({
+        "timestamp_local": t_local.astype(str),
+        "timestamp_utc": pd.DatetimeIndex(t_utc).astype(str),
+        "month": t_local.strftime("%b"),
+        **{k: np.asarray(v) for k, v in columns.items()},
+    })
+    extra = [c for c in frame.columns if c not in RECORD_COLUMNS]
+    return frame[[c for c in RECORD_COLUMNS if c in frame.columns] + extra]
+
+
+def _monthly_entry(sums, cnt, fixed_tilt_3d=None):
+    cnt = max(int(cnt), 1)
+    out = {
+        # totals
+        "Pmax_2D_monthly_total": float(sums["Pmax_2D"]),
+        "Pmax_3D_monthly_total": float(sums["Pmax_3D"]),
+    }
+    # averages
+    for k in _MONTHLY_AVG:
+        out[f"{k}_monthly_avg"] = float(sums[k] / cnt)
+    if fixed_tilt_3d is not None:
+        out["tilt_optimal_3D_monthly_avg"] = fixed_tilt_3d
+    out["count"] = cnt
+    return out
+
+
+def monthly_aggregates(frame, fixed_tilt_3d=None):
+    """Monthly totals / averages in the old nested-dict contract, one groupby."""
+    if frame.empty:
+        return {}
+
+    g = frame.groupby("month", sort=False)
+    sums = g[["Pmax_2D", "Pmax_3D"] + _MONTHLY_AVG].sum()
+    counts = g.size()
+    return {m: _monthly_entry(sums.loc[m], counts[m], fixed_tilt_3d) for m in sums.index}
+
+
+def yearly_totals(frame):
+    return {
+        "Pmax_2D_total": float(frame["Pmax_2D"].sum()) if len(frame) else 0.0,
+        "Pmax_3D_total": float(frame["Pmax_3D"].sum()) if len(frame) else 0.0,
+    }
+
+
+class MonthlyAccumulator:
+    """
+    Running monthly / yearly sums for streamed records, so the summary can
+    be produced without keeping the records around. Same output as
+    monthly_aggregates / yearly_totals.
+    """
+
+    _KEYS = ["Pmax_2D", "Pmax_3D"] + _MONTHLY_AVG
+
+    def __init__(self):
+        self.rows = 0
+        self._sums = {}
+        self._counts = {}
+
+    def add_row(self, record):
+        m = record["month"]
+        if m not in self._sums:
+            self._sums[m] = dict.fromkeys(self._KEYS, 0.0)
+            self._counts[m] = 0
+        sums = self._sums[m]
+        for k in self._KEYS:
+            sums[k] += record[k]
+        self._counts[m] += 1
+        self.rows += 1
+
+    def monthly(self, fixed_tilt_3d=None):
+        return {m: _monthly_entry(s, self._counts[m], fixed_tilt_3d)
+                for m, s in self._sums.items()}
+
+    def yearly(self):
+        return {
+            "Pmax_2D_total": float(sum(s["Pmax_2D"] for s in self._sums.values())),
+            "Pmax_3D_total": float(sum(s["Pmax_3D"] for s in self._sums.values())),
+        }
+
+
+def build_result(frame, output_format="rows", fixed_tilt_3d=None, monthly=None,
+                 yearly=None, **extra):
+    """
+    Final response dict. "rows" keeps the old list-of-records payload;
+    "columnar" sends struct-of-arrays under "data" instead. monthly /
+    yearly override the aggregates when `frame` holds only some records.
+    """
+    check_output_format(output_format)
+
+    out = {"status": "ok", "rows": len(frame), "format": output_format}
+    if output_format == "columnar":
+        out["columns"] = list(frame.columns)
+        out["data"] = frame.to_dict("list")
+    else:
+        out["data"] = frame.to_dict("records")
+
+    return {
+        **out,
+        "monthly": monthly if monthly is not None else monthly_aggregates(frame, fixed_tilt_3d),
+        "yearly_totals": yearly if yearly is not None else yearly_totals(frame),
+        **extra,
+    }
+
+
+# ------------------------------------------------------------------
+# RUNNER ADAPTERS
+# ------------------------------------------------------------------
+# The runners yield (i, row) per simulated timestamp and leave t_local,
+# t_utc, fixed_tilt_3d and summary (extra response fields) on a context
+# object once the generator is exhausted.
+def _keep(n, record_step):
+    """Record downsampling: every record_step-th record, none for 0."""
+    return record_step > 0 and n % record_step == 0
+
+
+def collect_result(ctx, rows, output_format="rows", record_step=1):
+    """
+    Whole-response path: gather the rows, then build_result. With
+    record_step != 1 only every record_step-th record is kept (0: none)
+    and the aggregates still cover all of them.
+    """
+    from collections import defaultdict
+
+    acc = MonthlyAccumulator() if record_step != 1 else None
+    cols = defaultdict(list)
+    kept = []
+    for n, (i, row) in enumerate(rows):
+        if acc is not None:
+            acc.add_row({"month": ctx.t_local[i].strftime("%b"), **row})
+        if _keep(n, record_step):
+            kept.append(i)
+            for k, v in row.items():
+                cols[k].append(v)
+
+    frame = build_frame(ctx.t_local[kept], ctx.t_utc[kept], cols)
+    if acc is None:
+        return build_result(frame, output_format, ctx.fixed_tilt_3d, **ctx.summary)
+    return build_result(frame, output_format, ctx.fixed_tilt_3d,
+                        monthly=acc.monthly(ctx.fixed_tilt_3d), yearly=acc.yearly(),
+                        record_step=record_step, rows_simulated=acc.rows, **ctx.summary)
+
+
+def stream_records(ctx, rows, record_step=1):
+    """
+    Streaming path: yields one record per timestamp (same keys as the
+    "rows" payload; every record_step-th only, if set) and finally
+    {"type": "summary", ...} with the monthly and yearly aggregates and
+    the runner's extra fields.
+    """
+    acc = MonthlyAccumulator()
+    emitted = 0
+    for n, (i, row) in enumerate(rows):
+        ts = ctx.t_local[i]
+        record = {
+            "timestamp_local": str(ts),
+            "timestamp_utc": str(ctx.t_utc[i]),
+            "month": ts.strftime("%b"),
+            **row,
+        }
+        acc.add_row(record)
+        if _keep(n, record_step):
+            emitted += 1
+            yield record
+
+    summary = {"type": "summary", "rows": emitted}
+    if record_step != 1:
+        summary.update(record_step=record_step, rows_simulated=acc.rows)
+    yield {
+        **summary,
+        "monthly": acc.monthly(ctx.fixed_tilt_3d),
+        "yearly_totals": acc.yearly(),
+        **ctx.summary,
+    }
@@ -0,0 +1,133 @@
+"""
+Precomputed shading lookup tables, one per module design.
+
+The direct fraction and cosine of every cell depend only on the in-plane
+sun angle and the tilt, so they are tabulated once (exact shading) over a
+dense grid and written to a versioned .npy file. At runtime the file is
+memory-mapped read-only, so every worker process shares the same page-cached
+data, and queries are answered by bilinear interpolation.
+
+Build ahead of deployment with:
+
+    python -m NOTC.shading_table [design_id ...]    (default design if none given)
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+TABLE_FORMAT = 1
+
+PHI_MIN, PHI_MAX, PHI_STEP = -90.0, 90.0, 0.25
+TILT_MIN, TILT_MAX, TILT_STEP = 0.0, 100.0, 0.25
+
+PHI_GRID = np.linspace(PHI_MIN, PHI_MAX, int(round((PHI_MAX - PHI_MIN) / PHI_STEP)) + 1)
+TILT_GRID = np.linspace(TILT_MIN, TILT_MAX, int(round((TILT_MAX - TILT_MIN) / TILT_STEP)) + 1)
+
+TABLE_DIR = os.getenv(
+    "NOTC_SHADING_TABLE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+)
+
+# design version -> memory-mapped table
+_tables = {}
+_lock = threading.Lock()
+
+
+def table_path(directory=None, design=None):
+    from NOTC.geometry import get_design
+
+    name = f"shading_table_v{TABLE_FORMAT}_{get_design(design).version}.npy"
+    return os.path.join(directory or TABLE_DIR, name)
+
+
+def build_table(path=None, design=None):
+    """
+    Tabulate (direct fraction, cosine) for every grid node with exact
+    shading and write it atomically. Shape: (n_phi, n_tilt, 2, n_cells).
+    """
+    from NOTC.area_notc import _area_kernel
+    from NOTC.geometry import get_design
+
+    design = get_design(design)
+    path = path or table_path(design=design)
+    # zen=phi with sun and module azimuth equal gives in-plane angle phi
+    frac, cos_i = _area_kernel(PHI_GRID, np.zeros_like(PHI_GRID), design.segments(TILT_GRID),
+                               0.0, 1, True)
+    table = np.stack([frac, cos_i], axis=2).astype(np.float32)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.save(fh, table)
+    os.replace(tmp, path)
+    return path
+
+
+def load_table(path=None, design=None):
+    """Memory-map the table for a design, building it once if missing."""
+    from NOTC.geometry import get_design
+
+    design = get_design(design)
+    table = _tables.get(design.version)
+    if table is not None and path is None:
+        return table
+    with _lock:
+        table = _tables.get(design.version)
+        if table is not None and path is None:
+            return table
+        p = path or table_path(design=design)
+        if not os.path.exists(p):
+            build_table(p, design)
+        table = np.load(p, mmap_mode="r")
+        if table.shape != (PHI_GRID.size, TILT_GRID.size, 2, design.n_cells):
+            raise ValueError(f"shading table {p} does not match the current grid")
+        if path is None:
+            _tables[design.version] = table
+        return table
+
+
+def projected_sun_angles(zen_deg, azi_deg, module_azimuth_deg):
+    """Vectorised in-plane sun angle, see area_notc.projected_sun_angle."""
+    zen = np.radians(np.asarray(zen_deg, float))
+    sun_h = np.sin(zen) * np.cos(np.radians(np.asarray(azi_deg, float) - module_azimuth_deg))
+    return np.degrees(np.arctan2(sun_h, np.cos(zen)))
+
+
+def _grid_weights(x, start, step, n):
+    pos = (np.asarray(x, float) - start) / step
+    i0 = np.clip(np.floor(pos).astype(int), 0, n - 2)
+    w = np.clip(pos - i0, 0.0, 1.0)
+    return i0, w
+
+
+def lookup_tensor(zen_deg, azi_deg, tilt_deg, module_azimuth_deg, design=None):
+    """
+    Bilinearly interpolated (direct fraction, cosine), each shaped
+    (n_times, n_tilts, n_cells) like make_area_tensor.
+    """
+    tilt_deg = np.atleast_1d(np.asarray(tilt_deg, float))
+    if tilt_deg.min() < TILT_MIN or tilt_deg.max() > TILT_MAX:
+        raise ValueError(f"tilt must lie in [{TILT_MIN}, {TILT_MAX}] for shading='table'")
+
+    table = load_table(design=design)
+    phi = np.atleast_1d(projected_sun_angles(zen_deg, azi_deg, module_azimuth_deg))
+
+    i0, wi = _grid_weights(phi, PHI_MIN, PHI_STEP, PHI_GRID.size)
+    j0, wj = _grid_weights(tilt_deg, TILT_MIN, TILT_STEP, TILT_GRID.size)
+    i0, wi = i0[:, None], wi[:, None, None, None]
+    j0, wj = j0[None, :], wj[None, :, None, None]
+
+    out = (
+        table[i0, j0] * (1 - wi) * (1 - wj)
+        + table[i0 + 1, j0] * wi * (1 - wj)
+        + table[i0, j0 + 1] * (1 - wi) * wj
+        + table[i0 + 1, j0 + 1] * wi * wj
+    ).astype(float)
+    return out[:, :, 0, :], out[:, :, 1, :]
+
+
+if __name__ == "__main__":
+    for design_id in sys.argv[1:] or [None]:
+        print("wrote", build_table(design=design_id))
@@ -1,20 +1,48 @@
 import math
+from collections import namedtuple
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
 import pandas as pd
 import pvlib
 
-from NOTC.area_notc import make_area_matrix_fast
-from NOTC.illuminiation_notc import apply_notc_irradiacne
+from NOTC.annual import annual_rows, check_timeline
+from NOTC.area_notc import cell_areas
+from NOTC.diode_solver import check_mpp_mode
+from NOTC.geometry import get_design
+from NOTC.illuminiation_notc import cell_irradiance
+from NOTC.instrumentation import timed
 from NOTC.normal_bishop import bishop_module1_performance
-from NOTC.pixi_bishop import bishop2
+from NOTC.pixi_bishop import bishop2_cells
+from NOTC.results import check_output_format, collect_result, stream_records
+from NOTC.turbidity import linke_turbidity, linke_turbidity_series
+from NOTC.weather import ambient_temperature
+
+# bump MODEL_REVISION when a change alters simulation output; the model
+# version keys persisted results, together with the design's geometry hash
+MODEL_REVISION = 1
+
+
+def model_version(design=None):
+    return f"{MODEL_REVISION}-{get_design(design).version}"
+
+
+MODEL_VERSION = model_version()
 
-print("IMPORTING tilt_analysis")
 # ------------------------------------------------------------------
 # TIMEZONE
 # ------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def get_timezone_finder():
+    # loading the timezone polygons is slow; build one finder per process
+    from timezonefinder import TimezoneFinder
+    return TimezoneFinder()
+
+
 def infer_timezone(lat, lon, fallback="UTC"):
     try:
-        from timezonefinder import TimezoneFinder
-        tf = TimezoneFinder()
+        tf = get_timezone_finder()
         return tf.timezone_at(lat=float(lat), lng=float(lon)) or fallback
     except Exception:
         return fallback
@@ -23,13 +51,14 @@ def infer_timezone(lat, lon, fallback="UTC"):
 # ------------------------------------------------------------------
 # SOLAR DATA
 # ------------------------------------------------------------------
+@timed("solar_position")
 def site_sun_and_clearsky_batch(lat, lon, time_utc, tz_str):
     solpos = pvlib.solarposition.get_solarposition(time_utc, lat, lon)
     zen = solpos["apparent_zenith"].to_numpy(float)
     azi = solpos["azimuth"].to_numpy(float)
 
     loc = pvlib.location.Location(lat, lon, tz_str)
-    cs = loc.get_clearsky(time_utc)
+    cs = loc.get_clearsky(time_utc, linke_turbidity=linke_turbidity_series(time_utc, lat, lon))
 
     return (
         zen,
@@ -40,6 +69,82 @@ def site_sun_and_clearsky_batch(lat, lon, time_utc, tz_str):
     )
 
 
+# everything a runner needs about the sun at one site; built by site_solar
+# or, for many sites in one vectorized pass, by multi_site_solar
+SiteSolar = namedtuple("SiteSolar", "tz t_local zen azi dni dhi ghi")
+
+
+def site_timestamps(tz, year, months, hours):
+    return pd.DatetimeIndex(
+        [pd.Timestamp(f"{year}-{m:02d}-21 {h:02d}:00", tz=tz)
+         for m in months for h in hours]
+    )
+
+
+def site_solar(lat, lon, year, months, hours):
+    tz = infer_timezone(lat, lon)
+    t_local = site_timestamps(tz, year, months, hours)
+    return SiteSolar(tz, t_local, *site_sun_and_clearsky_batch(lat, lon, t_local.tz_convert("UTC"), tz))
+
+
+@timed("solar_position")
+def multi_site_solar(lats, lons, year, months, hours):
+    """
+    site_solar for many sites at once. Solar position (NREL SPA) and the
+    Ineichen clear sky are computed on the flattened (site x timestamp)
+    arrays in a single call each, with the defaults get_solarposition and
+    Location.get_clearsky use (12 degC, delta_t 67 s, DEM site altitude
+    for the clear sky, Kasten-Young airmass). The Linke turbidity comes from
+    the memory-mapped grid in one lookup; only the altitude lookup remains
+    per site.
+    """
+    from pvlib import atmosphere, clearsky, irradiance, spa
+
+    lats = np.asarray(lats, float)
+    lons = np.asarray(lons, float)
+    tzs = [infer_timezone(la, lo) for la, lo in zip(lats, lons)]
+    t_locals = [site_timestamps(tz, year, months, hours) for tz in tzs]
+    sizes = [len(t) for t in t_locals]
+
+    t_utc = pd.DatetimeIndex(np.concatenate(
+        [t.tz_convert("UTC").as_unit("ns").asi8 for t in t_locals]
+    )).tz_localize("UTC")
+    lat = np.repeat(lats, sizes)
+    lon = np.repeat(lons, sizes)
+
+    unixtime = t_utc.asi8 / 1e9
+    bounds = np.cumsum([0] + sizes)
+
+    # sun geometry: get_solarposition's defaults (sea level, 101325 Pa)
+    app_zenith, _, _, _, azimuth, _ = spa.solar_position(
+        unixtime, lat, lon, 0.0, 1013.25, 12.0, 67.0, 0.5667
+    )
+
+    # clear sky: at site altitude, like Location.get_clearsky
+    alt = np.repeat([pvlib.location.lookup_altitude(la, lo) for la, lo in zip(lats, lons)], sizes)
+    pressure = atmosphere.alt2pres(alt)
+    app_zenith_cs = spa.solar_position(
+        unixtime, lat, lon, alt, pressure / 100, 12.0, 67.0, 0.5667
+    )[0]
+    linke = linke_turbidity(t_utc, lat, lon)
+    am_abs = atmosphere.get_absolute_airmass(
+        atmosphere.get_relative_airmass(app_zenith_cs), pressure
+    )
+    dni_extra = np.asarray(irradiance.get_extra_radiation(t_utc), float)
+    cs = clearsky.ineichen(app_zenith_cs, am_abs, linke, altitude=alt, dni_extra=dni_extra)
+
+    out = []
+    for k, (tz, t_local) in enumerate(zip(tzs, t_locals)):
+        sl = slice(bounds[k], bounds[k + 1])
+        out.append(SiteSolar(
+            tz, t_local,
+            np.asarray(app_zenith[sl], float), np.asarray(azimuth[sl], float),
+            np.asarray(cs["dni"][sl], float), np.asarray(cs["dhi"][sl], float),
+            np.asarray(cs["ghi"][sl], float),
+        ))
+    return out
+
+
 # ------------------------------------------------------------------
 # ANALYTIC BEST TILT (2D)
 # ------------------------------------------------------------------
@@ -51,6 +156,81 @@ def analytic_best_tilt_deg(solar_zen_deg, solar_azi_deg, module_azimuth_deg):
     return abs(math.degrees(math.atan(math.tan(zen) * math.cos(delta))))
 
 
+# ------------------------------------------------------------------
+# 3D BEST TILT (BOUNDED BRENT, WARM START)
+# ------------------------------------------------------------------
+TILT_SEARCH_MODES = ("grid", "brent")
+# accepted tilt_tol (deg); tol <= 0 would never end the search
+TILT_TOL_RANGE = (0.01, 10.0)
+
+
+def search_best_tilt(evaluate, warm_starts, lo=0.0, hi=60.0, tol=0.5, step=2.0):
+    """
+    Maximise evaluate(tilt)["Pmax"] over [lo, hi] with a warm-started
+    bracket + Brent-style search (parabolic steps, golden-section fallback).
+
+    The first two warm starts (previous optimum, analytic 2D tilt) are the
+    initial bracket points; the bracket is grown away from the worse one
+    until it encloses a maximum, then shrunk until it is narrower than 2*tol
+    or a parabolic step moves less than tol/2. Evaluations are memoised, so
+    the returned count is the number of geometry + Bishop runs.
+
+    Returns (best_tilt, best_out, n_evaluations).
+    """
+    golden = 0.3819660112501051
+    cache = {}
+
+    def f(tilt):
+        key = round(min(max(float(tilt), lo), hi), 6)
+        if key not in cache:
+            cache[key] = evaluate(key)
+        return cache[key]["Pmax"]
+
+    starts = [min(max(float(x), lo), hi) for x in warm_starts if x is not None]
+    x1 = starts[0]
+    x2 = starts[1] if len(starts) > 1 else x1
+    if abs(x2 - x1) < tol:
+        x2 = x1 + step if x1 + step <= hi else x1 - step
+
+    # ---- bracket: grow away from the worse point ----
+    m, o = (x1, x2) if f(x1) >= f(x2) else (x2, x1)
+    gap = max(abs(m - o), step)
+    d = 1.0 if m > o else -1.0
+    while True:
+        x = min(max(m + d * gap, lo), hi)
+        if x == m or f(x) < f(m):
+            break
+        o, m = m, x
+        gap *= 1.618
+    a, b = (o, x) if o < x else (x, o)
+
+    # ---- refine: parabolic step through (a, m, b), golden fallback ----
+    while b - a > 2 * tol:
+        fa, fm, fb = f(a), f(m), f(b)
+        num = (m - a) ** 2 * (fm - fb) - (m - b) ** 2 * (fm - fa)
+        den = (m - a) * (fm - fb) - (m - b) * (fm - fa)
+        x = m - 0.5 * num / den if den != 0 else None
+
+        if x is not None and a < x < b and abs(x - m) < tol / 2:
+            break  # parabola peaks at m to within tolerance
+        if x is None or not (a + tol / 2 < x < b - tol / 2):
+            x = m + golden * (b - m) if b - m > m - a else m - golden * (m - a)
+
+        if f(x) >= fm:
+            if x < m:
+                b = m
+            else:
+                a = m
+            m = x
+        elif x < m:
+            a = x
+        else:
+            b = x
+
+    best = max(cache, key=lambda k: cache[k]["Pmax"])
+    return best, cache[best], len(cache)
+
+
 # ------------------------------------------------------------------
 # 2D IRRADIANCE (UNCHANGED PHYSICS)
 # ------------------------------------------------------------------
@@ -85,7 +265,8 @@ def compute_2d_irradiance(
 # ------------------------------------------------------------------
 # MAIN DRIVER — BEST 2D vs BEST 3D
 # ------------------------------------------------------------------
-def run_sim_analytic_best_tilt(
+def _best_tilt_rows(
+    ctx,
     lat,
     lon,
     alpha_rear,
@@ -93,41 +274,42 @@ def run_sim_analytic_best_tilt(
     months=range(1, 13),
     hours=range(9, 17),
     samples=120,
+    shading="sampled",
+    tilt_search="grid",
+    tilt_tol=0.5,
+    weather=None,
+    solar=None,
+    design=None,
+    mpp="grid",
 ):
-    from collections import defaultdict
-
-    tz = infer_timezone(lat, lon)
+    """
+    Simulation loop of the best-tilt runner. Yields (i, row) for every
+    simulated timestamp; the timestamps and the summary fields are left
+    on `ctx` for collect_result / stream_records.
+    """
+    if tilt_search not in TILT_SEARCH_MODES:
+        raise ValueError(f"tilt_search must be one of {TILT_SEARCH_MODES}, got {tilt_search!r}")
+    lo_tol, hi_tol = TILT_TOL_RANGE
+    if not (math.isfinite(tilt_tol) and lo_tol <= tilt_tol <= hi_tol):
+        raise ValueError(f"tilt_tol must lie in [{lo_tol}, {hi_tol}] deg, got {tilt_tol!r}")
+
+    check_mpp_mode(mpp)
+    design = get_design(design)
     mod_az = 180.0 if lat >= 0 else 0.0
 
-    # timestamps
-    t_local = pd.DatetimeIndex(
-        [pd.Timestamp(f"{year}-{m:02d}-21 {h:02d}:00", tz=tz)
-         for m in months for h in hours]
-    )
+    # timestamps + sun (precomputed by batch callers)
+    if solar is None:
+        solar = site_solar(lat, lon, year, months, hours)
+    tz, t_local, zen, azi, dni, dhi, ghi = solar
     t_utc = t_local.tz_convert("UTC")
 
     # ---------------- TEMPERATURE (EXACT OLD LOGIC) ----------------
-    try:
-        tmy, _ = pvlib.iotools.get_pvgis_tmy(lat, lon)
-        tmy_year = tmy.index[0].year
-        tmy.index = tmy.index.tz_convert(tz)
-
-        t_local_tmy = t_local.map(lambda ts: ts.replace(year=tmy_year))
-        temp_air = pd.Series(
-            tmy["temp_air"].reindex(t_local_tmy, method="nearest").values,
-            index=t_local
-        )
-    except Exception:
-        temp_air = pd.Series(45.0, index=t_local)
+    temp_air, weather_source = ambient_temperature(lat, lon, t_local, tz, weather)
 
-    zen, azi, dni, dhi, ghi = site_sun_and_clearsky_batch(lat, lon, t_utc, tz)
+    ctx.t_local, ctx.t_utc, ctx.fixed_tilt_3d = t_local, t_utc, None
 
-    records = []
-    monthly_sums = defaultdict(lambda: defaultdict(float))
-    monthly_counts = defaultdict(int)
-
-    total_pmax_2d = 0.0
-    total_pmax_3d = 0.0
+    total_tilt_evals = 0
+    prev_tilt_3d = None
 
     # ------------------------------------------------------------------
     # MAIN LOOP
@@ -137,7 +319,6 @@ def run_sim_analytic_best_tilt(
             continue
 
         T_amb = float(temp_air.iloc[i])
-        month = t_local[i].strftime("%b")
 
         # =========================
         # 2D — BEST TILT (ANALYTIC)
@@ -149,37 +330,41 @@ def run_sim_analytic_best_tilt(
             zen[i], best_tilt_2d, azi[i], mod_az,
             alpha_rear
         )
-        out_2d = bishop_module1_performance(G2D, T_amb, dni[i], n_cells=5)
+        out_2d = bishop_module1_performance(G2D, T_amb, dni[i], n_cells=5, mpp=mpp)
 
         # =========================
-        # 3D — BEST TILT (SWEEP)
+        # 3D — BEST TILT (SWEEP OR BRENT)
         # =========================
-        best_pmax_3d = -1.0
-        best_tilt_3d = 0.0
-        best_out_3d = None
-
-        for tilt in range(0, 61, 5):
-            area = make_area_matrix_fast(zen[i], azi[i], tilt, mod_az, samples)
-            illum = apply_notc_irradiacne(area, dni[i], dhi[i],alpha_rear,ghi[i])
-            out = bishop2(area, illum, T_amb, dni[i])
-
-            if out["Pmax"] > best_pmax_3d:
-                best_pmax_3d = out["Pmax"]
-                best_tilt_3d = tilt
-                best_out_3d = out
+        def evaluate_3d(tilt):
+            cells = cell_areas(zen[i], azi[i], tilt, mod_az, samples, shading,
+                               use_cache=True, design=design)
+            cell_irradiance(cells, dni[i], dhi[i], ghi[i], alpha_rear)
+            return bishop2_cells(cells, T_amb, dni[i], mpp)
+
+        if tilt_search == "brent":
+            best_tilt_3d, best_out_3d, n_evals = search_best_tilt(
+                evaluate_3d, [prev_tilt_3d, best_tilt_2d], 0.0, 60.0, tilt_tol
+            )
+            prev_tilt_3d = best_tilt_3d
+        else:
+            best_pmax_3d = -1.0
+            best_tilt_3d = 0.0
+            best_out_3d = None
+            n_evals = 0
+
+            for tilt in range(0, 61, 5):
+                out = evaluate_3d(tilt)
+                n_evals += 1
+
+                if out["Pmax"] > best_pmax_3d:
+                    best_pmax_3d = out["Pmax"]
+                    best_tilt_3d = tilt
+                    best_out_3d = out
 
         out_3d = best_out_3d
+        total_tilt_evals += n_evals
 
-        pmax_2d = out_2d["Pmax_series"]
-        pmax_3d = out_3d["Pmax"]
-
-        total_pmax_2d += pmax_2d
-        total_pmax_3d += pmax_3d
-
-        rec = {
-            "timestamp_local": str(t_local[i]),
-            "timestamp_utc": str(t_utc[i]),
-            "month": month,
+        yield i, {
             "zen": float(zen[i]),
             "azi": float(azi[i]),
             "dni": float(dni[i]),
@@ -193,7 +378,7 @@ def run_sim_analytic_best_tilt(
             "Voc_2D": out_2d["Voc_series"],
             "Imp_2D": out_2d["Imp"],
             "Vmp_2D": out_2d["Vmp_series"],
-            "Pmax_2D": pmax_2d,
+            "Pmax_2D": out_2d["Pmax_series"],
             "FF_2D": out_2d["FF"],
 
             # 3D
@@ -202,58 +387,32 @@ def run_sim_analytic_best_tilt(
             "Imp_3D": out_3d["Imp"],
             "Vmp_3D": out_3d["Vmp"],
             "Voc_3D": out_3d["Voc"],
-            "Pmax_3D": pmax_3d,
+            "Pmax_3D": out_3d["Pmax"],
             "FF_3D": out_3d["FF"],
+            "tilt_evals_3D": n_evals,
         }
 
-        records.append(rec)
-
-        for k, v in rec.items():
-            if isinstance(v, (int, float)):
-                monthly_sums[month][k] += v
-        monthly_counts[month] += 1
-
-    # ---------------- MONTHLY AVERAGES ----------------
-    # ---------------- MONTHLY OUTPUT (MATCH OLD CONTRACT) ----------------
-    monthly_out = {}
-
-    for m, sums in monthly_sums.items():
-        cnt = max(monthly_counts[m], 1)
-
-        monthly_out[m] = {
-            # totals
-            "Pmax_2D_monthly_total": float(sums["Pmax_2D"]),
-            "Pmax_3D_monthly_total": float(sums["Pmax_3D"]),
-
-            # averages
-            "Isc_2D_monthly_avg": float(sums["Isc_2D"] / cnt),
-            "Isc_3D_monthly_avg": float(sums["Isc_3D"] / cnt),
-            "Imp_2D_monthly_avg": float(sums["Imp_2D"] / cnt),
-            "Imp_3D_monthly_avg": float(sums["Imp_3D"] / cnt),
-            "Vmp_2D_monthly_avg": float(sums["Vmp_2D"] / cnt),
-            "Vmp_3D_monthly_avg": float(sums["Vmp_3D"] / cnt),
-            "tilt_analytic_2D_monthly_avg": float(sums["tilt_analytic_2D"] / cnt),
-            "tilt_optimal_3D_monthly_avg": float(sums["tilt_optimal_3D"] / cnt),
-            "FF_2D_monthly_avg": float(sums["FF_2D"] / cnt),
-            "FF_3D_monthly_avg": float(sums["FF_3D"] / cnt),
-
-            "count": int(cnt),
-        }
-
-    # ---------------- FINAL RETURN (EXACT OLD SHAPE) ----------------
-    return {
-        "status": "ok",
-        "rows": len(records),
-        "data": records,  # per-timestamp (unchanged)
-        "monthly": monthly_out,  # OLD monthly schema
-        "yearly_totals": {
-            "Pmax_2D_total": float(total_pmax_2d),
-            "Pmax_3D_total": float(total_pmax_3d),
-        },
+    ctx.summary = {
+        "tilt_search": tilt_search,
+        "tilt_evaluations_total": int(total_tilt_evals),
+        "weather_source": weather_source,
+        "design": design.id,
+        "design_version": design.version,
+        "mpp": mpp,
     }
 
 
-def run_sim_analytic_fixed_tilt(
+def _best_tilt_timeline(ctx, timeline, step_minutes, lat, lon, alpha_rear, year, months, hours,
+                        samples, shading, tilt_search, tilt_tol, weather, solar, design, mpp):
+    if check_timeline(timeline) == "hourly_full_year":
+        return annual_rows(ctx, lat, lon, alpha_rear, year, step_minutes, samples,
+                           range(0, 61, 5), shading, weather, per_hour_best=True, design=design,
+                           mpp=mpp)
+    return _best_tilt_rows(ctx, lat, lon, alpha_rear, year, months, hours,
+                           samples, shading, tilt_search, tilt_tol, weather, solar, design, mpp)
+
+
+def run_sim_analytic_best_tilt(
     lat,
     lon,
     alpha_rear,
@@ -261,81 +420,145 @@ def run_sim_analytic_fixed_tilt(
     months=range(1, 13),
     hours=range(9, 17),
     samples=120,
-    tilts=range(0, 61, 5),
+    shading="sampled",
+    tilt_search="grid",
+    tilt_tol=0.5,
+    output_format="rows",
+    weather=None,
+    solar=None,
+    timeline="sampled",
+    step_minutes=60,
+    record_step=1,
+    design=None,
+    mpp="grid",
 ):
-    import pandas as pd
-    from collections import defaultdict
+    check_output_format(output_format)
+    ctx = SimpleNamespace()
+    rows = _best_tilt_timeline(ctx, timeline, step_minutes, lat, lon, alpha_rear, year, months,
+                               hours, samples, shading, tilt_search, tilt_tol, weather, solar,
+                               design, mpp)
+    return collect_result(ctx, rows, output_format, record_step)
 
-    tz = infer_timezone(lat, lon)
+
+def iter_sim_analytic_best_tilt(
+    lat,
+    lon,
+    alpha_rear,
+    year=2024,
+    months=range(1, 13),
+    hours=range(9, 17),
+    samples=120,
+    shading="sampled",
+    tilt_search="grid",
+    tilt_tol=0.5,
+    weather=None,
+    solar=None,
+    timeline="sampled",
+    step_minutes=60,
+    record_step=1,
+    design=None,
+    mpp="grid",
+):
+    """
+    Streaming variant of run_sim_analytic_best_tilt: yields each record as
+    soon as its timestamp is simulated, then one {"type": "summary"} trailer.
+    """
+    ctx = SimpleNamespace()
+    rows = _best_tilt_timeline(ctx, timeline, step_minutes, lat, lon, alpha_rear, year, months,
+                               hours, samples, shading, tilt_search, tilt_tol, weather, solar,
+                               design, mpp)
+    return stream_records(ctx, rows, record_step)
+
+
+def _fixed_tilt_rows(
+    ctx,
+    lat,
+    lon,
+    alpha_rear,
+    year=2024,
+    months=range(1, 13),
+    hours=range(9, 17),
+    samples=120,
+    tilts=range(0, 61, 5),
+    shading="sampled",
+    return_tilt_curve=False,
+    weather=None,
+    solar=None,
+    design=None,
+    mpp="grid",
+):
+    """
+    Simulation loop of the fixed-tilt runner. The yearly tilt selection
+    runs first; rows at the chosen tilt are then yielded as (i, row).
+    """
+    check_mpp_mode(mpp)
+    design = get_design(design)
     mod_az = 180.0 if lat >= 0 else 0.0
 
-    # ---------------- TIMESTAMPS ----------------
-    t_local = pd.DatetimeIndex(
-        [pd.Timestamp(f"{year}-{m:02d}-21 {h:02d}:00", tz=tz)
-         for m in months for h in hours]
-    )
+    # ---------------- TIMESTAMPS + SUN ----------------
+    if solar is None:
+        solar = site_solar(lat, lon, year, months, hours)
+    tz, t_local, zen, azi, dni, dhi, ghi = solar
     t_utc = t_local.tz_convert("UTC")
 
     # ---------------- TEMPERATURE ----------------
-    try:
-        tmy, _ = pvlib.iotools.get_pvgis_tmy(lat, lon)
-        tmy_year = tmy.index[0].year
-        tmy.index = tmy.index.tz_convert(tz)
-
-        t_local_tmy = t_local.map(lambda ts: ts.replace(year=tmy_year))
-        temp_air = pd.Series(
-            tmy["temp_air"].reindex(t_local_tmy, method="nearest").values,
-            index=t_local
-        )
-    except Exception:
-        temp_air = pd.Series(45.0, index=t_local)
-
-    zen, azi, dni, dhi, ghi = site_sun_and_clearsky_batch(lat, lon, t_utc, tz)
+    temp_air, weather_source = ambient_temperature(lat, lon, t_local, tz, weather)
 
     # ============================================================
     # STEP 1 — FIND BEST 3D TILT FOR THE YEAR (LIKE OLD VERSION)
+    # Every per-timestamp 3D output is kept in a (tilt x time) grid
+    # so step 2 only has to read the chosen tilt's row.
     # ============================================================
+    tilts = list(tilts)
+    out_keys_3d = ("Isc", "Imp", "Vmp", "Voc", "Pmax", "FF")
+    grid_3d = {k: np.zeros((len(tilts), len(t_utc))) for k in out_keys_3d}
     tilt_energy = {}
 
-    for tilt in tilts:
+    for k_tilt, tilt in enumerate(tilts):
         total_energy = 0.0
 
         for i in range(len(t_utc)):
             if zen[i] >= 90:
                 continue
 
-            area = make_area_matrix_fast(
-                zen[i], azi[i], tilt, mod_az, samples
+            cells = cell_areas(
+                zen[i], azi[i], tilt, mod_az, samples, shading, use_cache=True, design=design
             )
 
-            illum = apply_notc_irradiacne(
-                area, dni[i], dhi[i], ghi[i], alpha_rear
-            )
+            cell_irradiance(cells, dni[i], dhi[i], ghi[i], alpha_rear)
 
-            out = bishop2(area, illum, float(temp_air.iloc[i]), dni[i])
+            out = bishop2_cells(cells, float(temp_air.iloc[i]), dni[i], mpp)
 
+            for key in out_keys_3d:
+                grid_3d[key][k_tilt, i] = out[key]
             total_energy += float(out.get("Pmax", 0.0))
 
         tilt_energy[tilt] = total_energy
 
     best_tilt_3d = max(tilt_energy, key=tilt_energy.get)
+    k_best = tilts.index(best_tilt_3d)
+
+    ctx.t_local, ctx.t_utc, ctx.fixed_tilt_3d = t_local, t_utc, best_tilt_3d
+    ctx.summary = {
+        "best_3D_tilt": int(best_tilt_3d),
+        "weather_source": weather_source,
+        "design": design.id,
+        "design_version": design.version,
+        "mpp": mpp,
+    }
+    if return_tilt_curve:
+        ctx.summary["tilt_energy_curve"] = [
+            {"tilt": t, "Pmax_3D_total": float(e)} for t, e in tilt_energy.items()
+        ]
 
     # ============================================================
     # STEP 2 — MAIN SIMULATION USING BEST TILT
     # ============================================================
-    records = []
-    monthly_sums = defaultdict(lambda: defaultdict(float))
-    monthly_counts = defaultdict(int)
-
-    total_pmax_2d = 0.0
-    total_pmax_3d = 0.0
-
     for i in range(len(t_utc)):
         if zen[i] >= 90:
             continue
 
         T_amb = float(temp_air.iloc[i])
-        month = t_local[i].strftime("%b")
 
         # 2D analytic tilt
         best_tilt_2d = analytic_best_tilt_deg(zen[i], azi[i], mod_az)
@@ -346,29 +569,12 @@ def run_sim_analytic_fixed_tilt(
             alpha_rear
         )
 
-        out_2d = bishop_module1_performance(G2D, T_amb, dni[i], n_cells=5)
-
-        # 3D using best yearly tilt
-        area = make_area_matrix_fast(
-            zen[i], azi[i], best_tilt_3d, mod_az, samples
-        )
-
-        illum = apply_notc_irradiacne(
-            area, dni[i], dhi[i], ghi[i], alpha_rear
-        )
+        out_2d = bishop_module1_performance(G2D, T_amb, dni[i], n_cells=5, mpp=mpp)
 
-        out_3d = bishop2(area, illum, T_amb, dni[i])
+        # 3D using best yearly tilt (already computed in step 1)
+        out_3d = {key: float(grid_3d[key][k_best, i]) for key in out_keys_3d}
 
-        pmax_2d = out_2d["Pmax_series"]
-        pmax_3d = out_3d["Pmax"]
-
-        total_pmax_2d += pmax_2d
-        total_pmax_3d += pmax_3d
-
-        rec = {
-            "timestamp_local": str(t_local[i]),
-            "timestamp_utc": str(t_utc[i]),
-            "month": month,
+        yield i, {
             "zen": float(zen[i]),
             "azi": float(azi[i]),
             "dni": float(dni[i]),
@@ -382,7 +588,7 @@ def run_sim_analytic_fixed_tilt(
             "Voc_2D": out_2d["Voc_series"],
             "Imp_2D": out_2d["Imp"],
             "Vmp_2D": out_2d["Vmp_series"],
-            "Pmax_2D": pmax_2d,
+            "Pmax_2D": out_2d["Pmax_series"],
             "FF_2D": out_2d["FF"],
 
             # 3D
@@ -391,48 +597,74 @@ def run_sim_analytic_fixed_tilt(
             "Imp_3D": out_3d["Imp"],
             "Vmp_3D": out_3d["Vmp"],
             "Voc_3D": out_3d["Voc"],
-            "Pmax_3D": pmax_3d,
+            "Pmax_3D": out_3d["Pmax"],
             "FF_3D": out_3d["FF"],
         }
 
-        records.append(rec)
-
-        for k, v in rec.items():
-            if isinstance(v, (int, float)):
-                monthly_sums[month][k] += v
-
-        monthly_counts[month] += 1
-
-    # ---------------- MONTHLY OUTPUT ----------------
-    monthly_out = {}
-
-    for m, sums in monthly_sums.items():
-        cnt = max(monthly_counts[m], 1)
-
-        monthly_out[m] = {
-            "Pmax_2D_monthly_total": float(sums["Pmax_2D"]),
-            "Pmax_3D_monthly_total": float(sums["Pmax_3D"]),
-            "Isc_2D_monthly_avg": float(sums["Isc_2D"] / cnt),
-            "Isc_3D_monthly_avg": float(sums["Isc_3D"] / cnt),
-            "Imp_2D_monthly_avg": float(sums["Imp_2D"] / cnt),
-            "Imp_3D_monthly_avg": float(sums["Imp_3D"] / cnt),
-            "Vmp_2D_monthly_avg": float(sums["Vmp_2D"] / cnt),
-            "Vmp_3D_monthly_avg": float(sums["Vmp_3D"] / cnt),
-            "tilt_analytic_2D_monthly_avg": float(sums["tilt_analytic_2D"] / cnt),
-            "tilt_optimal_3D_monthly_avg": best_tilt_3d,
-            "FF_2D_monthly_avg": float(sums["FF_2D"] / cnt),
-            "FF_3D_monthly_avg": float(sums["FF_3D"] / cnt),
-            "count": int(cnt),
-        }
 
-    return {
-        "status": "ok",
-        "rows": len(records),
-        "data": records,
-        "monthly": monthly_out,
-        "yearly_totals": {
-            "Pmax_2D_total": float(total_pmax_2d),
-            "Pmax_3D_total": float(total_pmax_3d),
-        },
-        "best_3D_tilt": int(best_tilt_3d),
-    }
\ No newline at end of file
+def _fixed_tilt_timeline(ctx, timeline, step_minutes, lat, lon, alpha_rear, year, months, hours,
+                         samples, tilts, shading, return_tilt_curve, weather, solar, design, mpp):
+    if check_timeline(timeline) == "hourly_full_year":
+        return annual_rows(ctx, lat, lon, alpha_rear, year, step_minutes, samples, tilts,
+                           shading, weather, return_tilt_curve=return_tilt_curve, design=design,
+                           mpp=mpp)
+    return _fixed_tilt_rows(ctx, lat, lon, alpha_rear, year, months, hours,
+                            samples, tilts, shading, return_tilt_curve, weather, solar, design, mpp)
+
+
+def run_sim_analytic_fixed_tilt(
+    lat,
+    lon,
+    alpha_rear,
+    year=2024,
+    months=range(1, 13),
+    hours=range(9, 17),
+    samples=120,
+    tilts=range(0, 61, 5),
+    shading="sampled",
+    return_tilt_curve=False,
+    output_format="rows",
+    weather=None,
+    solar=None,
+    timeline="sampled",
+    step_minutes=60,
+    record_step=1,
+    design=None,
+    mpp="grid",
+):
+    check_output_format(output_format)
+    ctx = SimpleNamespace()
+    rows = _fixed_tilt_timeline(ctx, timeline, step_minutes, lat, lon, alpha_rear, year, months,
+                                hours, samples, tilts, shading, return_tilt_curve, weather, solar,
+                                design, mpp)
+    return collect_result(ctx, rows, output_format, record_step)
+
+
+def iter_sim_analytic_fixed_tilt(
+    lat,
+    lon,
+    alpha_rear,
+    year=2024,
+    months=range(1, 13),
+    hours=range(9, 17),
+    samples=120,
+    tilts=range(0, 61, 5),
+    shading="sampled",
+    return_tilt_curve=False,
+    weather=None,
+    solar=None,
+    timeline="sampled",
+    step_minutes=60,
+    record_step=1,
+    design=None,
+    mpp="grid",
+):
+    """
+    Streaming variant of run_sim_analytic_fixed_tilt. Records start after
+    the tilt-selection pass; the trailer carries best_3D_tilt and aggregates.
+    """
+    ctx = SimpleNamespace()
+    rows = _fixed_tilt_timeline(ctx, timeline, step_minutes, lat, lon, alpha_rear, year, months,
+                                hours, samples, tilts, shading, return_tilt_curve, weather, solar,
+                                design, mpp)
+    return stream_records(ctx, rows, record_step)
@@ -0,0 +1,177 @@
+"""
+Linke turbidity climatology for the Ineichen clear sky.
+
+pvlib.clearsky.lookup_linke_turbidity opens LinkeTurbidities.h5 and
+decompresses the chunks around the site on every call. Here the
+(2160 lat x 4320 lon x 12 month) uint8 grid is decompressed once into a
+.npy file next to the shading tables and memory-mapped read-only, so every
+worker process shares the same page-cached data and a lookup reads one
+12-byte record per site. Lookups take arrays of sites and timestamps and
+reproduce pvlib's nearest-node selection and day-of-year interpolation
+exactly.
+
+The file is written on first use (a second or two); build it ahead of
+deployment with:
+
+    python -m NOTC.turbidity
+
+If the directory is not writable the grid is held in memory instead.
+
+Configuration (environment):
+    NOTC_TURBIDITY_DIR   directory of the .npy file (default NOTC/data)
+"""
+import calendar
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pvlib
+
+logger = logging.getLogger(__name__)
+
+GRID_SHAPE = (2160, 4320, 12)
+# stored values are 20 * Linke turbidity
+SCALE = 20.0
+
+TURBIDITY_DIR = os.getenv(
+    "NOTC_TURBIDITY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+)
+
+_grid = None
+_lock = threading.Lock()
+
+
+def source_path():
+    return os.path.join(os.path.dirname(pvlib.__file__), "data", "LinkeTurbidities.h5")
+
+
+def grid_path(directory=None):
+    # keyed on the pvlib release that ships the climatology
+    return os.path.join(directory or TURBIDITY_DIR, f"linke_turbidity_pvlib-{pvlib.__version__}.npy")
+
+
+def _read_source():
+    import h5py
+
+    with h5py.File(source_path(), "r") as f:
+        return f["LinkeTurbidity"][:]
+
+
+def build_grid(path=None):
+    """Decompress the pvlib climatology into a .npy file, written atomically."""
+    path = path or grid_path()
+    values = _read_source()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.save(fh, values)
+    os.replace(tmp, path)
+    return path
+
+
+def load_grid():
+    """The process-wide grid: memory-mapped, built once if missing."""
+    global _grid
+    if _grid is not None:
+        return _grid
+    with _lock:
+        if _grid is None:
+            p = grid_path()
+            try:
+                if not os.path.exists(p):
+                    build_grid(p)
+                values = np.load(p, mmap_mode="r")
+            except OSError as e:
+                logger.warning("Linke turbidity grid not mapped (%s); holding it in memory", e)
+                values = _read_source()
+            if values.shape != GRID_SHAPE or values.dtype != np.uint8:
+                raise ValueError(f"Linke turbidity grid {p} has shape {values.shape}, dtype {values.dtype}")
+            _grid = values
+    return _grid
+
+
+# ------------------------------------------------------------------
+# LOOKUP
+# ------------------------------------------------------------------
+def _grid_index(degrees, lo, hi, n):
+    """Vectorised pvlib.clearsky._degrees_to_index: nearest grid node."""
+    degrees = np.asarray(degrees, float)
+    scale = n / (hi - lo)
+    index = (degrees - (lo + 1 / scale / 2)) * scale
+    # pvlib tolerates half a node (plus rounding slack) beyond either edge
+    bad = (index > n - 1 + 0.500001) | (index < -0.500001)
+    if bad.any():
+        raise ValueError(f"Input, {degrees[bad].flat[0]:g}, is out of range ({lo:g}, {hi:g}).")
+    return np.clip(np.around(index), 0, n - 1).astype(np.intp)
+
+
+def monthly_values(lats, lons):
+    """(n_sites, 12) stored monthly values (20 * TL) at the nearest nodes."""
+    i = _grid_index(lats, 90, -90, GRID_SHAPE[0])
+    j = _grid_index(lons, -180, 180, GRID_SHAPE[1])
+    return load_grid()[i, j]
+
+
+def _month_middles(leap):
+    # pvlib.clearsky._calendar_month_middles: day of year of each month's
+    # middle, padded with the previous December and the next January
+    mdays = np.array(calendar.mdays[1:])
+    ydays = 365
+    if leap:
+        mdays[1] += 1
+        ydays = 366
+    return np.concatenate([
+        [-calendar.mdays[-1] / 2.0],
+        np.cumsum(mdays) - mdays / 2.0,
+        [ydays + calendar.mdays[1] / 2.0],
+    ])
+
+
+MIDDLES = (_month_middles(False), _month_middles(True))
+
+
+def _interp_rows(x, xp, fp):
+    # np.interp with a row of fp per x; x lies strictly inside xp
+    j = np.searchsorted(xp, x, side="right") - 1
+    rows = np.arange(len(x))
+    slope = (fp[rows, j + 1] - fp[rows, j]) / (xp[j + 1] - xp[j])
+    return slope * (x - xp[j]) + fp[rows, j]
+
+
+def linke_turbidity(time, lats, lons, interp=True):
+    """
+    Linke turbidity per timestamp, like pvlib's lookup_linke_turbidity but
+    for one site per timestamp: lats / lons are scalars or arrays aligned
+    with `time`. Interpolation runs on the UTC day of year.
+    """
+    time = pd.DatetimeIndex(time)
+    time_utc = time.tz_localize("UTC") if time.tz is None else time.tz_convert("UTC")
+    n = len(time_utc)
+    lats = np.broadcast_to(np.asarray(lats, float), (n,))
+    lons = np.broadcast_to(np.asarray(lons, float), (n,))
+
+    # one record per distinct site, then expanded per timestamp
+    sites, inverse = np.unique(np.stack([lats, lons], axis=1), axis=0, return_inverse=True)
+    lts = monthly_values(sites[:, 0], sites[:, 1]).astype(float)[inverse.ravel()]
+
+    if not interp:
+        return lts[np.arange(n), time_utc.month.to_numpy() - 1] / SCALE
+
+    # previous December and next January around the year, as pvlib does
+    fp = np.concatenate([lts[:, -1:], lts, lts[:, :1]], axis=1)
+    doy = time_utc.dayofyear.to_numpy().astype(float)
+    leap = np.asarray(time_utc.is_leap_year)
+    out = np.where(leap, _interp_rows(doy, MIDDLES[1], fp), _interp_rows(doy, MIDDLES[0], fp))
+    return out / SCALE
+
+
+def linke_turbidity_series(time, lat, lon):
+    """Drop-in for pvlib.clearsky.lookup_linke_turbidity(time, lat, lon)."""
+    return pd.Series(linke_turbidity(time, lat, lon), index=time)
+
+
+if __name__ == "__main__":
+    print("wrote", build_grid())
@@ -0,0 +1,265 @@
+"""
+Weather providers for the simulation runners.
+
+The runners only need the PVGIS TMY air temperature. This module fetches
+it via a provider, keeps a local on-disk cache of TMY data (compressed
+NPZ, keyed on the lat/lon snapped to the PVGIS grid, with TTL and
+size-based eviction) and reports where each answer came from:
+
+    "cache"    served from the local TMY cache
+    "pvgis"    fetched from PVGIS (and written to the cache)
+    "offline"  served from fixture files by OfflineProvider
+    "fallback" nothing available, constant 45 degC (old behaviour)
+
+Configuration (environment):
+    NOTC_WEATHER_PROVIDER     pvgis (default) | offline
+    NOTC_WEATHER_FIXTURE_DIR  fixture directory for the offline provider
+    NOTC_TMY_CACHE_DIR        cache directory (default NOTC/data/tmy_cache)
+    NOTC_TMY_CACHE_TTL_DAYS   entry lifetime, default 30
+    NOTC_TMY_CACHE_MAX_MB     total cache size, default 200
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from NOTC.instrumentation import inc, record_cache, timed
+
+PVGIS_GRID_DEG = 0.05
+FALLBACK_TEMP_C = 45.0
+
+
+def snap_to_pvgis_grid(lat, lon, step=PVGIS_GRID_DEG):
+    snap = lambda x: round(round(float(x) / step) * step, 6)
+    return snap(lat), snap(lon)
+
+
+def tmy_key(lat, lon):
+    lat, lon = snap_to_pvgis_grid(lat, lon)
+    return f"tmy_{lat:+.4f}_{lon:+.4f}"
+
+
+def _save_npz(path, tmy):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    idx = pd.DatetimeIndex(tmy.index).tz_convert("UTC")
+    cols = {c: tmy[c].to_numpy(float) for c in tmy.columns
+            if pd.api.types.is_numeric_dtype(tmy[c])}
+    with open(tmp, "wb") as fh:
+        np.savez_compressed(fh, __time_ns__=idx.asi8, **cols)
+    os.replace(tmp, path)
+
+
+def _load_npz(path):
+    with np.load(path) as z:
+        index = pd.DatetimeIndex(pd.to_datetime(z["__time_ns__"], utc=True))
+        return pd.DataFrame({k: z[k] for k in z.files if k != "__time_ns__"}, index=index)
+
+
+# ------------------------------------------------------------------
+# PROVIDERS
+# ------------------------------------------------------------------
+class PVGISProvider:
+    """Live PVGIS TMY over the network."""
+
+    name = "pvgis"
+
+    def fetch(self, lat, lon):
+        import pvlib
+
+        lat, lon = snap_to_pvgis_grid(lat, lon)
+        return pvlib.iotools.get_pvgis_tmy(lat, lon)[0]
+
+
+class OfflineProvider:
+    """
+    Serves TMY data from fixture files, never touching the network.
+
+    Fixtures use the cache file format (<tmy_key>.npz, so a cache directory
+    can be copied as-is); default.npz, if present, answers any location.
+    """
+
+    name = "offline"
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def fetch(self, lat, lon):
+        for name in (f"{tmy_key(lat, lon)}.npz", "default.npz"):
+            path = os.path.join(self.fixture_dir, name)
+            if os.path.exists(path):
+                return _load_npz(path)
+        raise LookupError(f"no TMY fixture for {lat}, {lon} in {self.fixture_dir}")
+
+
+# ------------------------------------------------------------------
+# CACHE
+# ------------------------------------------------------------------
+class TMYCache:
+    """
+    On-disk TMY cache with TTL (by mtime, the write time) and total-size
+    eviction, least recently read first (atime, set on every hit). Several
+    worker processes may share the directory, so any file can vanish
+    between two calls; that is a miss, never an error.
+    """
+
+    def __init__(self, directory, ttl_seconds=30 * 86400, max_bytes=200 * 2**20):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, lat, lon):
+        return os.path.join(self.directory, f"{tmy_key(lat, lon)}.npz")
+
+    def get(self, lat, lon):
+        path = self._path(lat, lon)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        age = time.time() - mtime
+        if age > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            tmy = _load_npz(path)
+        except Exception:
+            self._remove(path)
+            return None
+        try:
+            # mark as read for eviction; keep mtime, the TTL runs from the write
+            os.utime(path, (time.time(), mtime))
+        except OSError:
+            pass  # evicted by another process meanwhile; the data is loaded
+        return tmy
+
+    def put(self, lat, lon, tmy):
+        os.makedirs(self.directory, exist_ok=True)
+        _save_npz(self._path(lat, lon), tmy)
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".npz"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue  # removed by another process
+                entries.append((st.st_atime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            # least recently read first
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(os.path.join(self.directory, name))
+                total -= size
+
+
+# ------------------------------------------------------------------
+# SERVICE
+# ------------------------------------------------------------------
+class WeatherService:
+    def __init__(self, provider, cache=None):
+        self.provider = provider
+        self.cache = cache
+
+    @timed("weather")
+    def get_tmy(self, lat, lon):
+        """Returns (tmy DataFrame or None, source)."""
+        tmy, source = self._get_tmy(lat, lon)
+        inc("notc_weather_requests_total", source=source)
+        return tmy, source
+
+    def _get_tmy(self, lat, lon):
+        if self.cache is not None:
+            tmy = self.cache.get(lat, lon)
+            record_cache("tmy", tmy is not None)
+            if tmy is not None:
+                return tmy, "cache"
+        try:
+            tmy = self.provider.fetch(lat, lon)
+        except Exception:
+            return None, "fallback"
+        if self.cache is not None and self.provider.name != "offline":
+            try:
+                self.cache.put(lat, lon, tmy)
+            except OSError:
+                pass
+        return tmy, self.provider.name
+
+
+class ResolvedWeather:
+    """
+    A get_tmy answer fetched up front (e.g. to key a result cache on its
+    source), handed to a runner so it does not fetch again.
+    """
+
+    def __init__(self, tmy, source):
+        self.tmy = tmy
+        self.source = source
+
+    @classmethod
+    def resolve(cls, lat, lon, service=None):
+        service = service or WEATHER
+        tmy, source = service.get_tmy(lat, lon)
+        if source == "cache":
+            # cached data is whatever the provider returned
+            source = service.provider.name
+        return cls(tmy, source)
+
+    def get_tmy(self, lat, lon):
+        # ambient_temperature re-indexes the frame in place
+        return (None if self.tmy is None else self.tmy.copy()), self.source
+
+
+def default_weather_service():
+    here = os.path.dirname(os.path.abspath(__file__))
+    cache = TMYCache(
+        os.getenv("NOTC_TMY_CACHE_DIR", os.path.join(here, "data", "tmy_cache")),
+        ttl_seconds=float(os.getenv("NOTC_TMY_CACHE_TTL_DAYS", "30")) * 86400,
+        max_bytes=float(os.getenv("NOTC_TMY_CACHE_MAX_MB", "200")) * 2**20,
+    )
+    if os.getenv("NOTC_WEATHER_PROVIDER", "pvgis") == "offline":
+        provider = OfflineProvider(os.getenv("NOTC_WEATHER_FIXTURE_DIR", os.path.join(here, "data", "weather_fixtures")))
+        return WeatherService(provider, cache=None)
+    return WeatherService(PVGISProvider(), cache)
+
+
+WEATHER = default_weather_service()
+
+
+@timed("weather")
+def ambient_temperature(lat, lon, t_local, tz, service=None):
+    """
+    TMY air temperature at each local timestamp (TMY year substituted,
+    nearest hour), or FALLBACK_TEMP_C everywhere if no TMY is available.
+
+    Returns (pd.Series indexed by t_local, source).
+    """
+    tmy, source = (service or WEATHER).get_tmy(lat, lon)
+    try:
+        if tmy is None:
+            raise LookupError("no TMY data")
+        tmy_year = tmy.index[0].year
+        tmy.index = tmy.index.tz_convert(tz)
+
+        t_local_tmy = t_local.map(lambda ts: ts.replace(year=tmy_year))
+        temp_air = pd.Series(
+            tmy["temp_air"].reindex(t_local_tmy, method="nearest").values,
+            index=t_local
+        )
+    except Exception:
+        temp_air = pd.Series(FALLBACK_TEMP_C, index=t_local)
+        source = "fallback"
+    return temp_air, source
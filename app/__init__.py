@@ -1,3 +1,5 @@
+import logging
+
 from flask import Flask
 from flask.cli import load_dotenv
 from flask_sqlalchemy import SQLAlchemy
@@ -14,6 +16,11 @@ socketio=SocketIO(cors_allowed_origins="*")
 def create_app():
     load_dotenv()
     app=Flask(__name__)
+    # NOTC_LOG_LEVEL=DEBUG turns on the per-timestep solver logging
+    logging.basicConfig(
+        level=os.getenv("NOTC_LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL")
     print("done")
 
@@ -32,8 +39,25 @@ def create_app():
 
     from app.calculations.routes import cal_bp
     from app.user_managment.routes import user_management_bp
+    from app.startup.routes import startup_bp
+    from app.jobs.routes import jobs_bp
+    from app.metrics.routes import metrics_bp
     app.register_blueprint(cal_bp)
     app.register_blueprint(user_management_bp)
-
-    socketio.init_app(app)
+    app.register_blueprint(startup_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(metrics_bp)
+
+    # JIT / singleton warm-up; /api/ready reports 503 until it finishes
+    from app.startup.controller import start
+    start()
+
+    # NOTC_SOCKETIO_MESSAGE_QUEUE (e.g. redis://localhost:6379/0) shares
+    # Socket.IO events between worker processes, and
+    # NOTC_SOCKETIO_WEBSOCKET_ONLY=1 refuses polling sessions, which live in
+    # one worker (gunicorn.conf.py)
+    options = {}
+    if os.getenv("NOTC_SOCKETIO_WEBSOCKET_ONLY") == "1":
+        options["transports"] = ["websocket"]
+    socketio.init_app(app, message_queue=os.getenv("NOTC_SOCKETIO_MESSAGE_QUEUE"), **options)
     return app
\ No newline at end of file
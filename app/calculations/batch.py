@@ -0,0 +1,159 @@
+"""
+Multi-site batch simulation (POST /api/batch_notc).
+
+Timezones, solar position and clear sky for all sites are computed in one
+vectorized pass in the request process (multi_site_solar), then the
+per-site simulations are fanned out over a spawn process pool. A failing
+site is reported in its own entry and never aborts the batch.
+
+Configuration (environment):
+    NOTC_BATCH_WORKERS     pool size, default cpu count
+    NOTC_BATCH_MAX_SITES   sites per request, default 200
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.jobs.worker import run_simulation_job
+
+BATCH_WORKERS = int(os.getenv("NOTC_BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_MAX_SITES = int(os.getenv("NOTC_BATCH_MAX_SITES", "200"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def batch_executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that already runs server threads
+            _pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool(pool):
+    # a worker died: the pool refuses new work, start a fresh one on demand
+    # (only once per broken pool, every future of it reports the break)
+    global _pool
+    with _pool_lock:
+        if pool is not None and pool is _pool:
+            _pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown)
+
+
+def _submit(kind, params):
+    """(pool, future) for one site; a broken pool is replaced once."""
+    pool = batch_executor()
+    try:
+        return pool, pool.submit(_timed_job, kind, params)
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        pool = batch_executor()
+        return pool, pool.submit(_timed_job, kind, params)
+
+
+def _timed_job(kind, params):
+    t0 = time.perf_counter()
+    result = run_simulation_job(kind, params)
+    return result, time.perf_counter() - t0
+
+
+def summary_row(entry):
+    """One line of the batch summary table."""
+    result = entry.get("result") or {}
+    yearly = result.get("yearly_totals", {})
+    return {
+        "site": entry["site"],
+        "id": entry.get("id"),
+        "lat": entry.get("lat"),
+        "lon": entry.get("lon"),
+        "status": entry["status"],
+        "weather_source": result.get("weather_source"),
+        "best_3D_tilt": result.get("best_3D_tilt"),
+        "Pmax_2D_total": yearly.get("Pmax_2D_total"),
+        "Pmax_3D_total": yearly.get("Pmax_3D_total"),
+        "elapsed_s": entry.get("elapsed_s"),
+        "error": entry.get("error"),
+    }
+
+
+def run_batch(kind, sites, year=2024, months=range(1, 13), hours=range(9, 17)):
+    """
+    `sites` is a list of (site entry, runner kwargs or None); entries whose
+    kwargs are None already carry an error. Returns the finished entries.
+    """
+    from NOTC.tilt_analysis import multi_site_solar, site_solar
+
+    t0 = time.perf_counter()
+    todo = [(entry, params) for entry, params in sites if params is not None]
+    solar = []
+    if todo:
+        try:
+            solar = multi_site_solar(
+                [p["lat"] for _, p in todo], [p["lon"] for _, p in todo],
+                year, months, hours,
+            )
+        except Exception:
+            # one bad site fails the vectorized pass: redo it site by site so
+            # only the failing entries carry the error
+            solar = []
+            for entry, params in todo:
+                try:
+                    solar.append(site_solar(params["lat"], params["lon"], year, months, hours))
+                except Exception as e:
+                    entry["status"] = "error"
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                    solar.append(None)
+    t_solar = time.perf_counter() - t0
+
+    jobs = [(entry, dict(params, year=year, months=list(months), hours=list(hours),
+                         solar=s))
+            for (entry, params), s in zip(todo, solar) if s is not None]
+    # sites lost to a dying pool worker get one more try on a fresh pool
+    for attempt in range(2):
+        futures = []
+        for entry, params in jobs:
+            try:
+                futures.append((entry, params, *_submit(kind, params)))
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = f"{type(e).__name__}: {e}"
+        jobs = []
+        for entry, params, pool, fut in futures:
+            try:
+                entry["result"], elapsed = fut.result()
+                entry["status"] = "ok"
+                entry["elapsed_s"] = round(elapsed, 3)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_pool(pool)
+                    if attempt == 0:
+                        jobs.append((entry, params))
+                        continue
+                entry["status"] = "error"
+                entry["error"] = f"{type(e).__name__}: {e}"
+        if not jobs:
+            break
+
+    timing = {
+        "solar_s": round(t_solar, 3),
+        "total_s": round(time.perf_counter() - t0, 3),
+    }
+    return [entry for entry, _ in sites], timing
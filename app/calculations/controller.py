@@ -1,22 +1,91 @@
-from Backend_functions.area_matrix_calcualtion import make_area_matrix
-from Backend_functions.bishops_equation import bishop_from_matrices
-from Backend_functions.illumination_matrix import make_illumination_matrix
-from Backend_functions.irradance_cal import LightField
-
-from NOTC.tilt_analysis import run_sim_analytic_best_tilt, run_sim_analytic_fixed_tilt
+import json
+import logging
 import traceback
-from flask import jsonify
+from flask import Response, jsonify
+
+logger = logging.getLogger(__name__)
+
+# Simulation modules (numpy/scipy/pandas/pvlib/numba) are imported inside the
+# handlers so importing the app stays cheap; app.startup warms them up.
+
+
+def parse_flag(value, name):
+    """JSON booleans, or "true"/"false"/"1"/"0" from form and query clients."""
+    if isinstance(value, bool):
+        return value
+    text=str(value).strip().lower()
+    if text in ("true","1","yes","on"):
+        return True
+    if text in ("false","0","no","off",""):
+        return False
+    raise ValueError(f"{name} must be a boolean, got {value!r}")
+
+def best_tilt_params(data):
+    """Request body -> run_sim_analytic_best_tilt kwargs (also used by jobs)."""
+    return dict(
+        lat=float(data.get("lat")),
+        lon=float(data.get("lon")),
+        alpha_rear=0.3657,
+        samples=80,
+        shading=data.get("shading","sampled"),
+        tilt_search=data.get("tilt_search","grid"),
+        tilt_tol=float(data.get("tilt_tol",0.5)),
+        output_format=data.get("format","rows"),
+        timeline=data.get("timeline","sampled"),
+        step_minutes=int(data.get("step_minutes",60)),
+        record_step=int(data.get("record_step",1)),
+        design=data.get("design"),
+        mpp=data.get("mpp","grid"),
+    )
 
+def fixed_tilt_params(data):
+    """Request body -> run_sim_analytic_fixed_tilt kwargs (also used by jobs)."""
+    return dict(
+        lat=float(data.get("lat")),
+        lon=float(data.get("lon")),
+        alpha_rear=0.3657,
+        samples=80,
+        shading=data.get("shading","sampled"),
+        return_tilt_curve=parse_flag(data.get("tilt_curve",False),"tilt_curve"),
+        output_format=data.get("format","rows"),
+        timeline=data.get("timeline","sampled"),
+        step_minutes=int(data.get("step_minutes",60)),
+        record_step=int(data.get("record_step",1)),
+        design=data.get("design"),
+        mpp=data.get("mpp","grid"),
+    )
+
+def ndjson_response(records):
+    """
+    Stream simulation records as newline-delimited JSON, one record per
+    line, flushed as they are produced. A failure mid-stream is reported as
+    a final {"type": "error"} line since the 200 status is already sent.
+    """
+    def generate():
+        try:
+            for rec in records:
+                yield json.dumps(rec, default=float) + "\n"
+        except Exception as e:
+            yield json.dumps({
+                "type": "error",
+                "message": str(e),
+                "trace": traceback.format_exc()
+            }) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
 
 def notc_best_angle(data):
+    from app.calculations.memo import memoized_result
+    from NOTC.tilt_analysis import iter_sim_analytic_best_tilt, run_sim_analytic_best_tilt
     try:
-        lat=float(data.get("lat"))
-        lon=float(data.get("lon"))
-        df=run_sim_analytic_best_tilt(lat=lat,lon=lon,alpha_rear=0.3657,samples=80)
-        print('df',df)
-        return df
+        params=best_tilt_params(data)
+        if parse_flag(data.get("stream",False),"stream"):
+            params.pop("output_format")
+            return ndjson_response(iter_sim_analytic_best_tilt(**params))
+        return memoized_result("best_tilt", run_sim_analytic_best_tilt, params)
     except Exception as e:
-        print('error',e)
+        logger.exception('notc_best_angle failed')
         return jsonify({
             "status": "error",
             "message": str(e),
@@ -24,19 +93,28 @@ def notc_best_angle(data):
         })
 
 def stc_calc_update(data):
+    from Backend_functions.area_matrix_calcualtion import STC_TILTS, stc_area_arrays
+    from Backend_functions.bishops_equation import bishop_sweep
+    from Backend_functions.illumination_matrix import illumination_arrays
+    from Backend_functions.irradance_cal import LightField
+    from app.encoding import encode_response
     try:
         irradiance=data.get("irradiance")
-        tilt = [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100]
         albedo=data.get("albedo")
+        shading=data.get("shading","sampled")
+        design=data.get("design")
+        mpp=data.get("mpp","grid")
+        iv_points=data.get("iv_points")
+        iv_points=None if iv_points is None else int(iv_points)
         n=0.1125
-        result=[]
-        for angle in tilt:
-            area_df=make_area_matrix(base_tilt_deg=angle,samples_per_cell=200,verbose=False)
-            lf=LightField(G_dir=irradiance,G_albedo=albedo,n=n).compute()
-            illum=make_illumination_matrix(area_df,lf.G_dir,lf.G_diff,lf.G_albedo,verbose=False)
 
-            out=bishop_from_matrices(area_df=area_df,illum_df=illum,temp_c=25.0,n_cells_series=5)
+        # geometry is fixed for STC: cached per process, one solve for all tilts
+        areas=stc_area_arrays(STC_TILTS,200,shading,design)
+        lf=LightField(G_dir=irradiance,G_albedo=albedo,n=n).compute()
+        illum=illumination_arrays(areas["Cosine"],lf.G_dir,lf.G_diff,lf.G_albedo)
 
+        result=[]
+        for angle,out in zip(STC_TILTS,bishop_sweep(areas,illum,temp_c=25.0,n_cells_series=5,mpp=mpp,iv_points=iv_points)):
             safe_out={}
             for k,v in out.items():
                 if isinstance(v,(int,float)):
@@ -45,21 +123,97 @@ def stc_calc_update(data):
                     safe_out[k]=v
 
             result.append({"Tilt_deg":angle,**safe_out})
-        return jsonify({"success":True,"result":result}),200
+        return encode_response({"success":True,"result":result})
     except Exception as e:
         return jsonify({"success":False,"message":str(e)}),400
 
+def list_designs():
+    from NOTC.geometry import DEFAULT_DESIGN_ID, DESIGNS
+    return jsonify({
+        "default": DEFAULT_DESIGN_ID,
+        "designs": [d.describe() for d in DESIGNS.all()],
+        "errors": DESIGNS.errors,
+    })
+
+def calculation_history(user_id, args):
+    from app.calculations.history import DEFAULT_LIMIT, CursorError, list_calculations
+    try:
+        limit=int(args.get("limit",DEFAULT_LIMIT))
+        items,next_cursor=list_calculations(user_id,limit,args.get("cursor"),args.get("kind"))
+    except (CursorError,ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "ok", "items": items, "next_cursor": next_cursor}), 200
+
+def calculation_detail(user_id, calc_id):
+    from app.calculations.history import get_calculation, summary
+    found=get_calculation(user_id,calc_id)
+    if found is None:
+        return jsonify({"status": "error", "message": "calculation not found"}), 404
+    row,result=found
+    resp=jsonify({"status": "ok", **summary(row), "result": result})
+    if row.cache_key:
+        resp.set_etag(row.cache_key)
+    return resp, 200
+
 def notc_without_tracker(data):
+    from app.calculations.memo import memoized_result
+    from NOTC.tilt_analysis import iter_sim_analytic_fixed_tilt, run_sim_analytic_fixed_tilt
     try:
-        lat=float(data.get("lat"))
-        lon=float(data.get("lon"))
-        df=run_sim_analytic_fixed_tilt(lat=lat,lon=lon,alpha_rear=0.3657,samples=80)
-        print('df',df)
-        return df
+        params=fixed_tilt_params(data)
+        if parse_flag(data.get("stream",False),"stream"):
+            params.pop("output_format")
+            return ndjson_response(iter_sim_analytic_fixed_tilt(**params))
+        return memoized_result("fixed_tilt", run_sim_analytic_fixed_tilt, params)
     except Exception as e:
-        print('error',e)
+        logger.exception('notc_without_tracker failed')
         return jsonify({
             "status": "error",
             "message": str(e),
             "trace": traceback.format_exc()
         })
+
+def notc_batch(data):
+    from app.calculations.batch import BATCH_MAX_SITES, run_batch, summary_row
+    kinds={"best_tilt":best_tilt_params,"fixed_tilt":fixed_tilt_params}
+    kind=data.get("kind","fixed_tilt")
+    sites=data.get("sites")
+    if kind not in kinds:
+        return jsonify({"status":"error","message":f"kind must be one of {tuple(kinds)}"}),400
+    if not isinstance(sites,list) or not sites:
+        return jsonify({"status":"error","message":"sites must be a non-empty list"}),400
+    if len(sites)>BATCH_MAX_SITES:
+        return jsonify({"status":"error","message":f"at most {BATCH_MAX_SITES} sites per batch"}),413
+
+    # shared options come from the body, any of them can be overridden per site
+    prepared=[]
+    for n,site in enumerate(sites):
+        entry={"site":n,"id":site.get("id") if isinstance(site,dict) else None,"status":"pending"}
+        try:
+            params=kinds[kind]({**data,**site})
+            if not (-90<=params["lat"]<=90 and -180<=params["lon"]<=180):
+                raise ValueError("lat/lon out of range")
+            entry["lat"],entry["lon"]=params["lat"],params["lon"]
+        except Exception as e:
+            entry.update(status="error",error=f"invalid site: {e}")
+            params=None
+        prepared.append((entry,params))
+
+    try:
+        entries,timing=run_batch(kind,prepared)
+    except Exception as e:
+        logger.exception('notc_batch failed')
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "trace": traceback.format_exc()
+        }),500
+
+    return jsonify({
+        "status":"ok",
+        "kind":kind,
+        "sites":len(entries),
+        "failed":sum(e["status"]!="ok" for e in entries),
+        "summary":[summary_row(e) for e in entries],
+        "results":entries,
+        "timing":timing,
+    }),200
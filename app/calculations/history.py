@@ -0,0 +1,102 @@
+"""
+Calculation history: the signed-in user's stored NOTC results.
+
+The listing is keyset-paginated on (created_at, calc_id), newest first,
+and only selects plain columns: the summary fields (yearly totals, best
+tilt) are generated columns projected out of the JSONB `result`, so a page
+is served from ix_notc_calculations_user_created without reading a single
+result blob. One full result is fetched by id; the row of a cache hit
+holds only the summary and takes its result from the stored row it points
+at (source_calc_id, see memo.record_hit).
+
+Cursors are opaque to clients: base64url of [created_at, calc_id] of the
+last item on the page.
+
+Only runs of the memoized endpoints (/api/calculate_py, /api/notc_custom)
+are listed, including those answered from the cache. Streamed runs, async
+jobs (/api/jobs) and batches (/api/batch_notc) are not stored and so are
+not listed.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import aliased
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at, calc_id):
+    raw = json.dumps([created_at.isoformat(), str(calc_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, calc_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(calc_id)
+    except Exception:
+        raise CursorError("invalid cursor") from None
+
+
+def summary(row):
+    return {
+        "calc_id": str(row.calc_id),
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "kind": row.kind,
+        "lat": row.latitude,
+        "lon": row.longitude,
+        "model_version": row.model_version,
+        "yearly_totals": {
+            "Pmax_2D_total": row.pmax_2d_total,
+            "Pmax_3D_total": row.pmax_3d_total,
+        },
+        "best_3D_tilt": row.best_tilt_3d,
+    }
+
+
+def list_calculations(user_id, limit=DEFAULT_LIMIT, cursor=None, kind=None):
+    """One page of the user's results: (summaries, next cursor or None)."""
+    from app import db
+    from app.calculations.models import Notc_calculations as C
+
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    q = (db.session.query(*C.SUMMARY_COLUMNS)
+         .filter(C.user_id == uuid.UUID(str(user_id))))
+    if kind:
+        q = q.filter(C.kind == kind)
+    if cursor:
+        created_at, calc_id = decode_cursor(cursor)
+        q = q.filter(tuple_(C.created_at, C.calc_id) < tuple_(created_at, calc_id))
+    # one extra row tells whether there is a next page
+    rows = q.order_by(C.created_at.desc(), C.calc_id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].calc_id)
+    return [summary(r) for r in rows], next_cursor
+
+
+def get_calculation(user_id, calc_id):
+    """(row, full result) for one of the user's results, or None."""
+    from app import db
+    from app.calculations.models import Notc_calculations as C
+
+    try:
+        calc_id = uuid.UUID(str(calc_id))
+    except ValueError:
+        return None
+    source = aliased(C)
+    return (db.session.query(C, func.coalesce(source.result, C.result))
+            .outerjoin(source, source.calc_id == C.source_calc_id)
+            .filter(C.calc_id == calc_id, C.user_id == uuid.UUID(str(user_id)))
+            .first())
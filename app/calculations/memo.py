@@ -0,0 +1,184 @@
+"""
+Result memoization for the NOTC calculation endpoints.
+
+A result is fully determined by the runner arguments, the model version
+(which includes the module design's geometry hash) and the weather
+source, so those are hashed into a canonical cache key.
+Results are stored in pixi.notc_calculations under that key and served
+from there on repeat requests. The key doubles as the ETag: a client
+holding it can revalidate with If-None-Match and get a bare 304. It is a
+weak ETag on MessagePack / Arrow / compressed bodies (app/encoding.py),
+which carry the same result in another representation.
+
+A signed-in user who is served a stored result gets a row of their own for
+it (record_hit), so the run shows up in their history (history.py). That
+row holds only the summary fields and points at the stored result
+(source_calc_id) instead of copying it.
+
+Set NOTC_RESULT_CACHE=off to always recompute (results are still stored).
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import uuid
+
+from flask import Response, request
+
+from NOTC.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+COORD_DECIMALS = 4  # ~11 m, well inside one TMY / clear-sky cell
+
+# runner arguments added after results were first stored: left out of the
+# key at their default, so results stored before they existed still match
+KEY_DEFAULTS = {"mpp": "grid"}
+
+
+def canonical_params(runner, params):
+    """Runner kwargs with defaults filled in and coordinates rounded."""
+    bound = inspect.signature(runner).bind(**params)
+    bound.apply_defaults()
+    args = dict(bound.arguments)
+    args.pop("weather", None)
+    args.pop("solar", None)
+    args["lat"] = round(float(args["lat"]), COORD_DECIMALS)
+    args["lon"] = round(float(args["lon"]), COORD_DECIMALS)
+    if "design" in args:
+        # None and the default id are the same request
+        from NOTC.geometry import get_design
+        args["design"] = get_design(args["design"]).id
+    for k, v in args.items():
+        if isinstance(v, range):
+            args[k] = list(v)
+    return args
+
+
+def cache_key(kind, args, model_version, weather_source):
+    args = {k: v for k, v in args.items() if KEY_DEFAULTS.get(k, object()) != v}
+    payload = json.dumps(
+        {"kind": kind, "args": args, "model": model_version, "weather": weather_source},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def current_user_id():
+    """JWT identity if a valid token came with the request, else None."""
+    try:
+        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def lookup(key):
+    """(calc_id, result) of the newest stored result for `key`, or None."""
+    from app import db
+    from app.calculations.models import Notc_calculations as C
+    try:
+        return (db.session.query(C.calc_id, C.result)
+                .filter(C.cache_key == key, C.source_calc_id.is_(None))
+                .order_by(C.created_at.desc())
+                .first())
+    except Exception as e:
+        logger.warning('result cache lookup failed: %s', e)
+        return None
+
+
+def history_stub(result):
+    """What a hit's history row keeps of `result`: the listed summary fields."""
+    totals = result.get("yearly_totals") or {}
+    return {
+        "status": result.get("status"),
+        "yearly_totals": {k: totals.get(k) for k in ("Pmax_2D_total", "Pmax_3D_total")},
+        "best_3D_tilt": result.get("best_3D_tilt"),
+    }
+
+
+def store(key, kind, args, model_version, result, source_calc_id=None):
+    from app import db
+    from app.calculations.models import Notc_calculations
+    try:
+        db.session.add(Notc_calculations(
+            user_id=current_user_id(),
+            latitude=args["lat"],
+            longitude=args["lon"],
+            result=result,
+            cache_key=key,
+            kind=kind,
+            model_version=model_version,
+            source_calc_id=source_calc_id,
+        ))
+        db.session.commit()
+    except Exception as e:
+        # never fail the request over the cache
+        db.session.rollback()
+        logger.warning('result cache store failed: %s', e)
+
+
+def record_hit(key, kind, args, model_version, source_calc_id, result):
+    """
+    Give a signed-in user their own row for a cache hit (from their
+    anonymous run or anyone else's), so it appears in their history. The
+    row points at the stored result rather than copying it.
+    """
+    from app import db
+    from app.calculations.models import Notc_calculations as C
+    user_id = current_user_id()
+    if user_id is None:
+        return
+    try:
+        # calc_id only, off ix_notc_calculations_user_key
+        owned = (db.session.query(C.calc_id)
+                 .filter(C.user_id == uuid.UUID(str(user_id)), C.cache_key == key)
+                 .first()) is not None
+    except Exception as e:
+        logger.warning('result cache owner lookup failed: %s', e)
+        return
+    if not owned:
+        store(key, kind, args, model_version, history_stub(result), source_calc_id)
+
+
+def memoized_result(kind, runner, params):
+    """
+    Run `runner(**params)` through the result cache and return the Flask
+    response, tagged with the cache key as ETag and X-Result-Cache hit/miss.
+    """
+    from app.encoding import encode_response, is_identity
+    from NOTC.tilt_analysis import model_version
+    from NOTC.weather import ResolvedWeather
+
+    args = canonical_params(runner, params)
+    version = model_version(args.get("design"))
+    weather = ResolvedWeather.resolve(args["lat"], args["lon"])
+    key = cache_key(kind, args, version, weather.source)
+
+    if request.if_none_match.contains_weak(key):
+        resp = Response(status=304)
+        resp.set_etag(key)
+        return resp
+
+    stored = None
+    if os.getenv("NOTC_RESULT_CACHE", "on") != "off":
+        stored = lookup(key)
+        record_cache("result", stored is not None)
+    state = "hit"
+    if stored is None:
+        state = "miss"
+        result = runner(**args, weather=weather)
+        if result.get("status") == "ok":
+            store(key, kind, args, version, result)
+    else:
+        source_calc_id, result = stored
+        record_hit(key, kind, args, version, source_calc_id, result)
+
+    resp = encode_response(result)
+    resp.set_etag(key, weak=not is_identity(resp))
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Result-Cache"] = state
+    return resp
+
@@ -2,18 +2,63 @@ from app import db
 import uuid
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey, Float
+from sqlalchemy import Column, Computed, String, Text, TIMESTAMP, ForeignKey, Float, Index, text
 
 
 class Notc_calculations(db.Model):
     __tablename__ = "notc_calculations"
-    __table_args__ = {"schema": "pixi"}
+    __table_args__ = (
+        # result memoization lookups: newest stored result for a cache key
+        Index("ix_notc_calculations_cache_key_stored", "cache_key", "created_at",
+              postgresql_where=text("source_calc_id IS NULL")),
+        # memo.record_hit: does the user already have a row for this key
+        Index("ix_notc_calculations_user_key", "user_id", "cache_key"),
+        # history listing (history.py): keyset on (user_id, created_at, calc_id),
+        # covering the summary columns so a page never touches `result`
+        Index(
+            "ix_notc_calculations_user_created", "user_id", "created_at", "calc_id",
+            postgresql_include=["kind", "latitude", "longitude", "model_version",
+                                "pmax_2d_total", "pmax_3d_total", "best_tilt_3d"],
+        ),
+        {"schema": "pixi"},
+    )
 
     calc_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("pixi.users.user_id"), nullable=False)
+    # anonymous requests are memoized too
+    user_id = Column(UUID(as_uuid=True), ForeignKey("pixi.users.user_id"), nullable=True)
 
     latitude = Column(Float, nullable=False)  # maps to double precision
     longitude = Column(Float, nullable=False)  # maps to double precision
 
     result = Column(JSONB, nullable=False)  # JSONB column
-    created_at = Column(TIMESTAMP, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+    cache_key = Column(String(64))  # sha256 of the canonical request, see memo.py
+    kind = Column(String(32))
+    model_version = Column(String(64))
+    # a cache hit's history row (memo.record_hit): `result` only holds the
+    # summary fields, the full result is on this row
+    source_calc_id = Column(UUID(as_uuid=True), ForeignKey("pixi.notc_calculations.calc_id"),
+                            nullable=True)
+
+    # summary fields projected out of `result` by Postgres (see migrations/002)
+    pmax_2d_total = Column(Float, Computed(
+        "(result -> 'yearly_totals' ->> 'Pmax_2D_total')::double precision", persisted=True))
+    pmax_3d_total = Column(Float, Computed(
+        "(result -> 'yearly_totals' ->> 'Pmax_3D_total')::double precision", persisted=True))
+    best_tilt_3d = Column(Float, Computed(
+        "(result ->> 'best_3D_tilt')::double precision", persisted=True))
+
+
+# what the history listing selects: everything but the JSONB blob
+Notc_calculations.SUMMARY_COLUMNS = (
+    Notc_calculations.calc_id,
+    Notc_calculations.created_at,
+    Notc_calculations.kind,
+    Notc_calculations.latitude,
+    Notc_calculations.longitude,
+    Notc_calculations.model_version,
+    Notc_calculations.pmax_2d_total,
+    Notc_calculations.pmax_3d_total,
+    Notc_calculations.best_tilt_3d,
+)
@@ -1,22 +1,48 @@
+import logging
+
 from flask import Blueprint,request
-from app.calculations.controller import notc_best_angle, notc_without_tracker, stc_calc_update
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from app.calculations.controller import (calculation_detail, calculation_history, list_designs, notc_batch,
+                                         notc_best_angle, notc_without_tracker, stc_calc_update)
+
+logger = logging.getLogger(__name__)
 
 cal_bp=Blueprint('call',__name__,url_prefix='/api')
 
 @cal_bp.route("/calculate_py",methods=['POST'])
 def calculate_py():
     data=request.get_json()
-    print('data received',data)
+    logger.debug('data received %s', data)
     return notc_best_angle(data)
 
 @cal_bp.route("/notc_custom",methods=['POST'])
 def cal_notc_cust():
     data=request.get_json()
-    print('data received',data)
+    logger.debug('data received %s', data)
     return notc_without_tracker(data)
 
 @cal_bp.route("/stc",methods=['POST'])
 def cal_stc():
     data=request.get_json()
-    print('data received',data)
-    return stc_calc_update(data)
\ No newline at end of file
+    logger.debug('data received %s', data)
+    return stc_calc_update(data)
+
+@cal_bp.route("/batch_notc",methods=['POST'])
+def cal_batch_notc():
+    data=request.get_json()
+    logger.debug('batch received %d sites', len(data.get("sites") or []))
+    return notc_batch(data)
+
+@cal_bp.route("/designs",methods=['GET'])
+def designs():
+    return list_designs()
+
+@cal_bp.route("/calculations",methods=['GET'])
+@jwt_required()
+def calculations():
+    return calculation_history(get_jwt_identity(), request.args)
+
+@cal_bp.route("/calculations/<calc_id>",methods=['GET'])
+@jwt_required()
+def calculation(calc_id):
+    return calculation_detail(get_jwt_identity(), calc_id)
@@ -0,0 +1,170 @@
+"""
+Response encodings for the simulation endpoints.
+
+encode_response(payload) negotiates the body format from Accept and the
+compression from Accept-Encoding:
+
+    application/json                      default; orjson when installed, else the stdlib encoder
+    application/msgpack                   MessagePack (needs msgpack; also application/x-msgpack)
+    application/vnd.apache.arrow.stream   Arrow IPC stream of the per-record table (needs pyarrow)
+
+Bodies of at least NOTC_COMPRESS_MIN_BYTES are compressed with br (needs
+brotli) or gzip when the client accepts them. Formats whose package is not
+installed are not offered; a client that accepts none of the offered
+formats gets 406. Error responses are always plain JSON.
+
+The Arrow stream holds the tabular part of the payload ("data" rows or
+columns, the STC "result" list); every other field goes as JSON into the
+schema metadata under b"notc".
+
+Encode time and body size are recorded per response
+(notc_response_encode_seconds, notc_response_bytes).
+
+Configuration (environment):
+    NOTC_COMPRESS_MIN_BYTES   compression threshold, default 1024
+    NOTC_GZIP_LEVEL           default 6
+    NOTC_BROTLI_QUALITY       default 4 (speed over ratio, per request)
+"""
+import gzip
+import os
+import time
+
+import numpy as np
+from flask import Response, current_app, request
+
+from NOTC.instrumentation import observe
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("NOTC_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("NOTC_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("NOTC_BROTLI_QUALITY", "4"))
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+# metric label per format
+FORMAT_NAMES = {JSON: "json", MSGPACK: "msgpack", "application/x-msgpack": "msgpack", ARROW: "arrow"}
+
+# tabular payload fields, in the order they are looked for
+TABLE_FIELDS = ("data", "result")
+
+
+def _default(o):
+    # numpy scalars / arrays and pandas timestamps that reach a payload
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    return str(o)
+
+
+def encode_json(payload):
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        )
+    return current_app.json.dumps(payload).encode()
+
+
+def encode_msgpack(payload):
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def _table_field(payload):
+    for key in TABLE_FIELDS:
+        value = payload.get(key)
+        if isinstance(value, dict) or (isinstance(value, list) and value
+                                       and isinstance(value[0], dict)):
+            return key
+    return None
+
+
+def encode_arrow(payload):
+    key = _table_field(payload)
+    if key is None:
+        table = pa.table({})
+        rest = payload
+    else:
+        value = payload[key]
+        table = pa.Table.from_pydict(value) if isinstance(value, dict) else pa.Table.from_pylist(value)
+        rest = {k: v for k, v in payload.items() if k != key}
+        rest["table_field"] = key
+    table = table.replace_schema_metadata({b"notc": encode_json(rest)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def available_formats():
+    formats = {JSON: encode_json}
+    if msgpack is not None:
+        formats[MSGPACK] = formats["application/x-msgpack"] = encode_msgpack
+    if pa is not None:
+        formats[ARROW] = encode_arrow
+    return formats
+
+
+def available_encodings():
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def encode_response(payload, status=200):
+    """Negotiated, optionally compressed Response for a JSON-able payload."""
+    formats = available_formats()
+    mimetype = JSON
+    if status < 400:
+        # JSON first: it wins ties and a missing / */* Accept
+        accept = request.accept_mimetypes
+        mimetype = accept.best_match(list(formats)) if accept else JSON
+        if mimetype is None:
+            body = encode_json({"status": "error",
+                                "message": f"acceptable formats: {list(formats)}"})
+            return Response(body, status=406, mimetype=JSON)
+
+    t0 = time.perf_counter()
+    body = formats[mimetype](payload)
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is not None:
+            body = compress(body, encoding)
+    fmt = FORMAT_NAMES[mimetype]
+    observe("notc_response_encode_seconds", time.perf_counter() - t0, format=fmt)
+    observe("notc_response_bytes", len(body), format=fmt, encoding=encoding or "identity")
+
+    resp = Response(body, status=status, mimetype=mimetype)
+    if encoding is not None:
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.update(("Accept", "Accept-Encoding"))
+    return resp
+
+
+def is_identity(resp):
+    """True for a plain, uncompressed JSON body (strong ETags apply)."""
+    return resp.mimetype == JSON and "Content-Encoding" not in resp.headers
@@ -0,0 +1,242 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import logging
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import jsonify
+
+from app import socketio
+from app.calculations.controller import best_tilt_params, fixed_tilt_params
+from app.jobs.worker import run_simulation_job
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = {
+    "best_tilt": best_tilt_params,
+    "fixed_tilt": fixed_tilt_params,
+}
+
+MAX_WORKERS = int(os.getenv("NOTC_JOB_WORKERS", str(os.cpu_count() or 1)))
+MAX_QUEUED = int(os.getenv("NOTC_JOB_MAX_QUEUED", "64"))
+JOB_TTL_S = float(os.getenv("NOTC_JOB_TTL_S", "3600"))
+
+
+class JobManager:
+    """
+    In-memory job registry in front of a bounded process pool.
+
+    Jobs wait in our own FIFO and are handed to the pool only when a worker
+    is free, so "queued" / "running", queue depth and wait time are exact
+    and queued jobs can really be cancelled. Finished jobs are kept for
+    JOB_TTL_S seconds so clients can collect their results.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queued=MAX_QUEUED):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool = None
+        self._jobs = {}
+        self._pending = deque()
+        self._active = 0
+        self._lock = threading.RLock()
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: never fork a process that already runs server threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _reset_pool(self, pool):
+        # a worker died: the pool refuses new work, start a fresh one on demand
+        # (only once per broken pool, every future of it reports the break)
+        if pool is not None and pool is self._pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def queue_depth(self):
+        return len(self._pending)
+
+    def _purge(self):
+        now = time.time()
+        for job_id in [k for k, j in self._jobs.items()
+                       if j["finished_at"] and now - j["finished_at"] > JOB_TTL_S]:
+            del self._jobs[job_id]
+
+    def submit(self, kind, params):
+        with self._lock:
+            self._purge()
+            depth = self.queue_depth()
+            if depth >= self.max_queued:
+                return None
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "kind": kind,
+                "params": params,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "queue_depth_at_submit": depth,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job_id] = job
+            self._pending.append(job_id)
+            failed = self._dispatch()
+        self._emit_done(failed)
+        return job
+
+    def _submit(self, job):
+        args = (run_simulation_job, job["kind"], job["params"])
+        try:
+            return self._executor().submit(*args)
+        except BrokenProcessPool:
+            self._reset_pool(self._pool)
+            return self._executor().submit(*args)
+
+    def _dispatch(self):
+        """Start queued jobs on free workers; summaries of jobs that could not start."""
+        failed = []
+        while self._active < self.max_workers and self._pending:
+            job = self._jobs.get(self._pending.popleft())
+            if job is None or job["status"] != "queued":
+                continue
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                future = self._submit(job)
+            except Exception as e:
+                logger.exception('job %s could not be started', job["job_id"])
+                if isinstance(e, BrokenProcessPool):
+                    self._reset_pool(self._pool)
+                job["status"] = "failed"
+                job["error"] = f"could not start job: {e}"
+                job["finished_at"] = time.time()
+                failed.append(self.summary(job))
+                continue
+            self._active += 1
+            future.add_done_callback(
+                lambda f, job_id=job["job_id"], pool=self._pool: self._on_done(job_id, f, pool))
+        return failed
+
+    def _on_done(self, job_id, future, pool=None):
+        done = []
+        with self._lock:
+            self._active -= 1
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._reset_pool(pool)
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["finished_at"] = time.time()
+                if job["status"] == "cancelled":
+                    pass  # result of a cancelled running job is discarded
+                elif future.exception() is not None:
+                    job["status"] = "failed"
+                    job["error"] = str(future.exception())
+                else:
+                    job["result"] = future.result()
+                    job["status"] = "done"
+                done.append(self.summary(job))
+            done += self._dispatch()
+        self._emit_done(done)
+
+    def _emit_done(self, summaries):
+        for summary in summaries:
+            try:
+                socketio.emit("job_done", summary)
+            except Exception as e:
+                logger.warning('job_done emit failed: %s', e)
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                self._pending.remove(job_id)
+                job["status"] = "cancelled"
+                job["finished_at"] = time.time()
+            elif job["status"] == "running":
+                # a pool worker cannot be interrupted; its result is dropped
+                job["status"] = "cancelled"
+            return job
+
+    def summary(self, job):
+        started = job["started_at"]
+        end = started or job["finished_at"] or time.time()
+        run_s = (job["finished_at"] or time.time()) - started if started else None
+        return {
+            "job_id": job["job_id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "submitted_at": job["submitted_at"],
+            "started_at": started,
+            "finished_at": job["finished_at"],
+            "queue_depth_at_submit": job["queue_depth_at_submit"],
+            "queue_depth": self.queue_depth(),
+            "wait_s": round(end - job["submitted_at"], 4),
+            "run_s": round(run_s, 4) if run_s is not None else None,
+            "error": job["error"],
+        }
+
+
+JOBS = JobManager()
+atexit.register(JOBS.shutdown)
+
+
+def create_job(data):
+    try:
+        kind = data.get("kind", "best_tilt")
+        if kind not in JOB_KINDS:
+            return jsonify({"status": "error", "message": f"kind must be one of {list(JOB_KINDS)}"}), 400
+        params = JOB_KINDS[kind](data.get("params", data))
+        job = JOBS.submit(kind, params)
+        if job is None:
+            return jsonify({"status": "error", "message": "job queue is full"}), 429
+        return jsonify({"status": "ok", **JOBS.summary(job)}), 202
+    except Exception as e:
+        logger.exception('create_job failed')
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "trace": traceback.format_exc()
+        }), 400
+
+
+def get_job(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "job not found"}), 404
+    body = {"status": "ok", "job": JOBS.summary(job)}
+    if job["status"] == "done":
+        body["result"] = job["result"]
+    return jsonify(body), 200
+
+
+def cancel_job(job_id):
+    job = JOBS.cancel(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "job not found"}), 404
+    return jsonify({"status": "ok", "job": JOBS.summary(job)}), 200
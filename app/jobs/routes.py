@@ -0,0 +1,22 @@
+import logging
+
+from flask import Blueprint,request
+from app.jobs.controller import create_job, get_job, cancel_job
+
+logger = logging.getLogger(__name__)
+
+jobs_bp=Blueprint('jobs',__name__,url_prefix='/api')
+
+@jobs_bp.route("/jobs",methods=['POST'])
+def post_job():
+    data=request.get_json()
+    logger.debug('job received %s', data)
+    return create_job(data)
+
+@jobs_bp.route("/jobs/<job_id>",methods=['GET'])
+def read_job(job_id):
+    return get_job(job_id)
+
+@jobs_bp.route("/jobs/<job_id>",methods=['DELETE'])
+def delete_job(job_id):
+    return cancel_job(job_id)
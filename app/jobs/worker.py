@@ -0,0 +1,9 @@
+def run_simulation_job(kind, params):
+    """Runs in a pool worker process; imports the simulation lazily."""
+    if kind == "best_tilt":
+        from NOTC.tilt_analysis import run_sim_analytic_best_tilt as run
+    elif kind == "fixed_tilt":
+        from NOTC.tilt_analysis import run_sim_analytic_fixed_tilt as run
+    else:
+        raise ValueError(f"unknown job kind {kind!r}")
+    return run(**params)
@@ -0,0 +1,28 @@
+import time
+
+from flask import Response, g, request
+
+from NOTC.instrumentation import METRICS
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_response():
+    # importing registers the scrape-time cache collectors even if no
+    # simulation has run in this process yet
+    import NOTC.area_cache  # noqa: F401
+    import Backend_functions.area_matrix_calcualtion  # noqa: F401
+    return Response(METRICS.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def start_request_timer():
+    g.metrics_t0 = time.perf_counter()
+
+
+def record_request(response):
+    t0 = g.pop("metrics_t0", None)
+    if t0 is not None and request.path.startswith("/api/"):
+        endpoint = request.endpoint or "unmatched"
+        METRICS.observe("notc_http_request_seconds", time.perf_counter() - t0, endpoint=endpoint)
+        METRICS.inc("notc_http_requests_total", endpoint=endpoint, status=str(response.status_code))
+    return response
@@ -0,0 +1,12 @@
+from flask import Blueprint
+from app.metrics.controller import metrics_response, record_request, start_request_timer
+
+metrics_bp=Blueprint('metrics',__name__,url_prefix='/api')
+
+# time every API request handled by this app, not just this blueprint's
+metrics_bp.before_app_request(start_request_timer)
+metrics_bp.after_app_request(record_request)
+
+@metrics_bp.route("/metrics",methods=['GET'])
+def metrics():
+    return metrics_response()
@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+# per-process startup state; phases are recorded in the order they ran
+_state = {
+    "ready": False,
+    "error": None,
+    "started_at": None,
+    "phases": {},
+}
+_lock = threading.Lock()
+
+
+def _phase(name, fn):
+    t0 = time.perf_counter()
+    fn()
+    _state["phases"][name] = round(time.perf_counter() - t0, 4)
+
+
+def _import_numerics():
+    import numpy, pandas, scipy.optimize  # noqa: F401
+
+
+def _import_pvlib():
+    import pvlib  # noqa: F401
+
+
+def _import_simulation():
+    import NOTC.tilt_analysis  # noqa: F401
+    import Backend_functions.area_matrix_calcualtion  # noqa: F401
+    import Backend_functions.bishops_equation  # noqa: F401
+
+
+def _timezone_finder():
+    from NOTC.tilt_analysis import get_timezone_finder
+    get_timezone_finder()
+
+
+def _jit_warmup():
+    import numpy as np
+    from NOTC.diode_solver import string_current_jit, string_mpp
+    from NOTC.area_notc import warm_up_kernels
+    warm_up_kernels()
+    string_current_jit(np.linspace(0, 0.7, 4), np.ones((1, 2)), 1e-12, 0.015, 2282, 1.2, 0.026)
+    string_mpp(np.ones((1, 2)), 1e-12, 0.015, 2282, 1.2, 0.026, 0.7)
+
+
+def _stc_geometry():
+    # the /api/stc tilt sweep geometry, cached for the life of the process
+    from Backend_functions.area_matrix_calcualtion import STC_TILTS, stc_area_arrays
+    stc_area_arrays(STC_TILTS, 200, "sampled")
+
+
+def _shading_table():
+    # only map an already-built table; building it is a deploy step
+    from NOTC.shading_table import load_table, table_path
+    if os.path.exists(table_path()):
+        load_table()
+
+
+def _linke_turbidity():
+    # maps the turbidity grid, writing it from pvlib's HDF5 file on first deploy
+    from NOTC.turbidity import load_grid
+    load_grid()
+
+
+PHASES = [
+    ("import_numerics", _import_numerics),
+    ("import_pvlib", _import_pvlib),
+    ("import_simulation", _import_simulation),
+    ("timezone_finder", _timezone_finder),
+    ("jit_warmup", _jit_warmup),
+    ("shading_table", _shading_table),
+    ("linke_turbidity", _linke_turbidity),
+    ("stc_geometry", _stc_geometry),
+]
+
+
+def run_startup():
+    """Run every warm-up phase once per process and mark the worker ready."""
+    with _lock:
+        if _state["ready"]:
+            return
+        _state["started_at"] = time.time()
+        try:
+            for name, fn in PHASES:
+                _phase(name, fn)
+            _state["ready"] = True
+            logger.info("startup phases %s", _state["phases"])
+        except Exception as e:
+            # the traceback goes to the log only; /api/ready is unauthenticated
+            _state["error"] = str(e)
+            logger.exception("startup failed")
+
+
+def start(mode=None):
+    """
+    NOTC_WARMUP=sync        warm up before create_app returns
+    NOTC_WARMUP=background  warm up in a thread; /api/ready gates traffic (default)
+    NOTC_WARMUP=off         skip warm-up, report ready immediately
+    """
+    mode = mode or os.getenv("NOTC_WARMUP", "background")
+    if mode == "off":
+        _state["ready"] = True
+    elif mode == "sync":
+        run_startup()
+    else:
+        threading.Thread(target=run_startup, name="notc-warmup", daemon=True).start()
+
+
+def readiness():
+    body = {
+        "ready": _state["ready"],
+        "phases": _state["phases"],
+        "total_s": round(sum(_state["phases"].values()), 4),
+    }
+    if _state["error"]:
+        body["error"] = _state["error"]
+    return jsonify(body), (200 if _state["ready"] else 503)
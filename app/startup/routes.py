@@ -0,0 +1,8 @@
+from flask import Blueprint
+from app.startup.controller import readiness
+
+startup_bp=Blueprint('startup',__name__,url_prefix='/api')
+
+@startup_bp.route("/ready",methods=['GET'])
+def ready():
+    return readiness()
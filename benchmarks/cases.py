@@ -0,0 +1,209 @@
+"""
+Benchmark cases: (name, params, setup) where setup(**params) returns the
+zero-argument callable that is timed. Inputs are built in setup so only
+the kernel itself is measured.
+
+Every case runs on a fixed sun / site so numbers are comparable across
+runs; caches that would make repeats free (AREA_CACHE, the STC geometry
+lru_cache) are cleared inside the timed call.
+"""
+import numpy as np
+import pandas as pd
+
+# Bangalore, 21 Apr 10:00 local
+LAT, LON = 12.9716, 77.5945
+ZEN, AZI = 35.0, 110.0
+DNI, DHI, GHI = 780.0, 110.0, 850.0
+ALPHA_REAR = 0.3657
+MOD_AZ = 180.0
+
+QUICK = "quick"
+FULL = "full"
+
+
+# ------------------------------------------------------------------
+# STUB WEATHER
+# ------------------------------------------------------------------
+class StubProvider:
+    """Synthetic TMY (daily temperature cycle), no network, no disk."""
+    name = "stub"
+
+    def fetch(self, lat, lon):
+        idx = pd.date_range("2005-01-01", "2006-01-01", freq="1h", tz="UTC", inclusive="left")
+        hour = idx.hour.to_numpy() + lon / 15.0
+        temp = 27.0 + 6.0 * np.sin((hour - 9.0) / 24.0 * 2 * np.pi)
+        return pd.DataFrame({"temp_air": temp}, index=idx)
+
+
+def stub_weather():
+    from NOTC.weather import WeatherService
+    return WeatherService(StubProvider(), cache=None)
+
+
+# ------------------------------------------------------------------
+# SETUPS
+# ------------------------------------------------------------------
+def _sun_grid(n_times):
+    # a sweep of morning-to-afternoon suns, all above the horizon
+    zen = np.linspace(70.0, 15.0, n_times)
+    azi = np.linspace(95.0, 250.0, n_times)
+    return zen, azi
+
+
+def _notc_inputs(samples=80, shading="sampled"):
+    from NOTC.area_notc import make_area_matrix_fast
+    from NOTC.illuminiation_notc import apply_notc_irradiacne
+    area = make_area_matrix_fast(ZEN, AZI, 30.0, MOD_AZ, samples, shading)
+    return area, apply_notc_irradiacne(area, DNI, DHI, ALPHA_REAR, GHI)
+
+
+def _stc_inputs(samples=200):
+    from Backend_functions.area_matrix_calcualtion import make_area_matrix
+    from Backend_functions.illumination_matrix import make_illumination_matrix
+    from Backend_functions.irradance_cal import LightField
+    area = make_area_matrix(30.0, samples, verbose=False)
+    lf = LightField(1000.0, 135.0, 0.1125).compute()
+    return area, make_illumination_matrix(area, lf.G_dir, lf.G_diff, lf.G_albedo, verbose=False)
+
+
+def make_area_matrix_case(samples):
+    from Backend_functions.area_matrix_calcualtion import make_area_matrix, stc_area_arrays
+
+    def run():
+        stc_area_arrays.cache_clear()
+        make_area_matrix(30.0, samples, verbose=False)
+    return run
+
+
+def make_area_matrix_fast_case(samples, shading):
+    from NOTC.area_notc import make_area_matrix_fast
+    return lambda: make_area_matrix_fast(ZEN, AZI, 30.0, MOD_AZ, samples, shading)
+
+
+def make_area_tensor_case(n_times, n_tilts, samples, shading):
+    from NOTC.area_notc import make_area_tensor
+    zen, azi = _sun_grid(n_times)
+    tilts = np.linspace(0.0, 60.0, n_tilts)
+    return lambda: make_area_tensor(zen, azi, tilts, MOD_AZ, samples, shading)
+
+
+def apply_notc_irradiacne_case():
+    from NOTC.illuminiation_notc import apply_notc_irradiacne
+    area, _ = _notc_inputs()
+    return lambda: apply_notc_irradiacne(area, DNI, DHI, ALPHA_REAR, GHI)
+
+
+def make_illumination_matrix_case():
+    from Backend_functions.illumination_matrix import make_illumination_matrix
+    area, _ = _stc_inputs()
+    return lambda: make_illumination_matrix(area, 1000.0, 127.7, 135.0, verbose=False)
+
+
+def bishop2_case():
+    from NOTC.pixi_bishop import bishop2
+    area, illum = _notc_inputs()
+    return lambda: bishop2(area, illum, 30.0, DNI)
+
+
+def cell_pipeline_case(samples, shading, mpp):
+    # what the sampled runners do per (timestamp, tilt): no DataFrames
+    from NOTC.area_notc import cell_areas
+    from NOTC.illuminiation_notc import cell_irradiance
+    from NOTC.pixi_bishop import bishop2_cells
+
+    def run():
+        cells = cell_areas(ZEN, AZI, 30.0, MOD_AZ, samples, shading)
+        cell_irradiance(cells, DNI, DHI, GHI, ALPHA_REAR)
+        return bishop2_cells(cells, 30.0, DNI, mpp)
+    return run
+
+
+def bishop2_arrays_case(n_times, n_tilts, mpp):
+    from NOTC.area_notc import make_area_tensor
+    from NOTC.pixi_bishop import bishop2_arrays
+    zen, azi = _sun_grid(n_times)
+    frac, cos_i = make_area_tensor(zen, azi, np.linspace(0.0, 60.0, n_tilts), MOD_AZ, 80, "exact")
+    dni, dhi, ghi, temp = (np.full(n_times, v) for v in (DNI, DHI, GHI, 30.0))
+    return lambda: bishop2_arrays(frac, cos_i, dni, dhi, ghi, ALPHA_REAR, temp, mpp=mpp)
+
+
+def bishop_from_matrices_case(mpp, iv_points):
+    from Backend_functions.bishops_equation import bishop_from_matrices
+    area, illum = _stc_inputs()
+    return lambda: bishop_from_matrices(area, illum, temp_c=25.0, n_cells_series=5,
+                                        mpp=mpp, iv_points=iv_points)
+
+
+def bishop_module1_performance_case():
+    from NOTC.normal_bishop import bishop_module1_performance
+    return lambda: bishop_module1_performance(850.0, 30.0, DNI, n_cells=5)
+
+
+def _runner_case(fn_name, months, samples, shading, **extra):
+    import NOTC.tilt_analysis as ta
+    from NOTC.area_cache import AREA_CACHE
+    fn = getattr(ta, fn_name)
+    weather = stub_weather()
+
+    def run():
+        AREA_CACHE.clear()
+        result = fn(LAT, LON, ALPHA_REAR, months=range(1, months + 1), samples=samples,
+                    shading=shading, weather=weather, **extra)
+        if result.get("status") != "ok":
+            raise RuntimeError(result.get("message"))
+    return run
+
+
+def run_sim_analytic_best_tilt_case(months, samples, shading):
+    return _runner_case("run_sim_analytic_best_tilt", months, samples, shading)
+
+
+def run_sim_analytic_fixed_tilt_case(months, samples, shading):
+    return _runner_case("run_sim_analytic_fixed_tilt", months, samples, shading)
+
+
+# ------------------------------------------------------------------
+# GRIDS
+# ------------------------------------------------------------------
+def _grid(**axes):
+    keys = list(axes)
+    combos = [{}]
+    for k in keys:
+        combos = [dict(c, **{k: v}) for c in combos for v in axes[k]]
+    return combos
+
+
+def cases(suite=QUICK):
+    """[(name, params, setup)] for the quick or the full suite."""
+    full = suite == FULL
+    out = []
+
+    def add(name, setup, grid):
+        out.extend((name, params, setup) for params in grid)
+
+    add("make_area_matrix", make_area_matrix_case,
+        _grid(samples=[200, 500] if full else [200]))
+    add("make_area_matrix_fast", make_area_matrix_fast_case,
+        _grid(samples=[40, 80, 200] if full else [80], shading=["sampled", "exact"]))
+    add("make_area_tensor", make_area_tensor_case,
+        _grid(n_times=[8, 96, 384] if full else [8, 96],
+              n_tilts=[1, 13, 31] if full else [13],
+              samples=[80], shading=["sampled", "exact"] if full else ["exact"]))
+    add("apply_notc_irradiacne", apply_notc_irradiacne_case, [{}])
+    add("make_illumination_matrix", make_illumination_matrix_case, [{}])
+    add("bishop2", bishop2_case, [{}])
+    add("cell_pipeline", cell_pipeline_case,
+        _grid(samples=[80], shading=["sampled", "exact"], mpp=["grid", "exact"]))
+    add("bishop2_arrays", bishop2_arrays_case,
+        _grid(n_times=[8, 96] if full else [8], n_tilts=[1, 13] if full else [13],
+              mpp=["grid", "exact"]))
+    add("bishop_from_matrices", bishop_from_matrices_case,
+        _grid(mpp=["grid", "exact"], iv_points=[None, 40]))
+    add("bishop_module1_performance", bishop_module1_performance_case, [{}])
+    add("run_sim_analytic_best_tilt", run_sim_analytic_best_tilt_case,
+        _grid(months=[1, 4, 12] if full else [1], samples=[80],
+              shading=["sampled", "exact"] if full else ["exact"]))
+    add("run_sim_analytic_fixed_tilt", run_sim_analytic_fixed_tilt_case,
+        _grid(months=[1, 4, 12] if full else [1], samples=[80],
+              shading=["sampled", "exact"] if full else ["exact"]))
+    return out
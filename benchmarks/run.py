@@ -0,0 +1,155 @@
+"""
+Micro-benchmarks for the geometry, irradiance and solver kernels and the
+end-to-end runners (stub weather, no network).
+
+    python -m benchmarks.run                       quick suite -> benchmarks/results.json
+    python -m benchmarks.run --suite full          full parameter grids
+    python -m benchmarks.run --only bishop         cases whose name contains "bishop"
+    python -m benchmarks.run --save-baseline       also store the results as the baseline
+    python -m benchmarks.run --threshold 0.25      fail if any median is >25% over baseline
+
+Each case is run once untimed (JIT compile, imports), then timed in
+`--repeat` rounds of N calls, N chosen so a round takes at least
+`--min-time` seconds. The median per-call time is compared against the
+baseline file if it exists; the exit status is 1 when any case regressed
+past the threshold (NOTC_BENCH_THRESHOLD, default 0.25).
+
+Baselines are machine specific: record one on the machine that runs the
+comparison, from the commit you compare against.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.cases import QUICK, FULL, cases
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def case_id(name, params):
+    if not params:
+        return name
+    return name + "[" + ",".join(f"{k}={v}" for k, v in sorted(params.items())) + "]"
+
+
+def time_case(fn, repeat=5, min_time=0.2):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - t0, 1e-9)
+    number = max(1, int(min_time / once))
+
+    per_call = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - t0) / number)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_s": min(per_call),
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+    }
+
+
+def environment():
+    import numba
+    import numpy
+    import pandas
+    import pvlib
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "numba": numba.__version__,
+        "pvlib": pvlib.__version__,
+        "numba_threading_layer": os.getenv("NUMBA_THREADING_LAYER"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Per-case ratio to the baseline median; returns (rows, regressed ids)."""
+    base = {r["id"]: r for r in baseline.get("results", [])}
+    rows, regressed = [], []
+    for r in results:
+        b = base.get(r["id"])
+        if b is None:
+            continue
+        ratio = r["median_s"] / b["median_s"] if b["median_s"] > 0 else float("inf")
+        r["baseline_median_s"] = b["median_s"]
+        r["ratio"] = round(ratio, 4)
+        rows.append(r)
+        if ratio > 1.0 + threshold:
+            regressed.append(r["id"])
+    return rows, regressed
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--suite", choices=[QUICK, FULL], default=QUICK)
+    p.add_argument("--only", help="substring filter on case names")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--min-time", type=float, default=0.2)
+    p.add_argument("--output", default=DEFAULT_OUTPUT)
+    p.add_argument("--baseline", default=DEFAULT_BASELINE)
+    p.add_argument("--threshold", type=float,
+                   default=float(os.getenv("NOTC_BENCH_THRESHOLD", "0.25")),
+                   help="allowed slowdown of the median vs baseline (0.25 = +25%%)")
+    p.add_argument("--save-baseline", action="store_true")
+    args = p.parse_args(argv)
+
+    results = []
+    for name, params, setup in cases(args.suite):
+        if args.only and args.only not in name:
+            continue
+        cid = case_id(name, params)
+        stats = time_case(setup(**params), args.repeat, args.min_time)
+        results.append({"id": cid, "name": name, "params": params, **stats})
+        print(f"{cid:<80} {stats['median_s'] * 1e3:12.3f} ms", flush=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "suite": args.suite,
+        "environment": environment(),
+        "threshold": args.threshold,
+        "results": results,
+    }
+
+    regressed = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressed = compare(results, baseline, args.threshold)
+        report["baseline"] = {"path": args.baseline, "created_at": baseline.get("created_at"),
+                              "compared": len(rows), "regressed": regressed}
+        for r in rows:
+            flag = "REGRESSED" if r["id"] in regressed else ""
+            print(f"{r['id']:<80} x{r['ratio']:<8} {flag}")
+    else:
+        print(f"no baseline at {args.baseline}; nothing compared")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print("baseline saved to", args.baseline)
+
+    if regressed:
+        print(f"{len(regressed)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Production serving: one preloaded master, N forked workers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master imports the app and runs the whole warm-up (pvlib, Numba
+kernels, timezone polygons, shading table, Linke turbidity grid, STC
+geometry) before forking, so every worker starts ready and shares those
+pages copy-on-write; a recycled worker is a cheap fork of the warm master
+rather than a cold start. Each worker is a separate interpreter, so
+simulations from different users run on different cores instead of
+queueing on one GIL.
+
+One worker is the default. A Socket.IO session that starts with HTTP
+long-polling (the client default) lives in one worker, and its next poll
+landing on another worker fails with "Invalid session". More than one
+worker therefore requires NOTC_SOCKETIO_WEBSOCKET_ONLY=1, which makes the
+server accept the websocket transport only (clients must connect with
+transports: ["websocket"]), and NOTC_SOCKETIO_MESSAGE_QUEUE, e.g. a local
+redis://localhost:6379/0 (needs the redis package), to fan job_done events
+out across workers. Otherwise the config refuses to start.
+
+Per-worker state is not shared: /api/metrics reports the worker that
+answers the scrape, and an async job (/api/jobs) is known only to the
+worker that accepted it.
+
+Configuration (environment):
+    NOTC_BIND                      default 0.0.0.0:5054
+    NOTC_WEB_WORKERS               worker processes, default 1
+    NOTC_WEB_THREADS               threads per worker, default 4
+    NOTC_WEB_TIMEOUT               seconds before a silent worker is killed, default 300
+    NOTC_WEB_MAX_REQUESTS          recycle a worker after this many requests, default 1000 (0 = never)
+    NOTC_WEB_MAX_REQUESTS_JITTER   default 100
+    NOTC_SOCKETIO_MESSAGE_QUEUE    Socket.IO message queue URL, needed with more than one worker
+    NOTC_SOCKETIO_WEBSOCKET_ONLY   1 = websocket transport only, needed with more than one worker
+
+Numba threads, job pool and batch pool sizes default to the cores divided
+among the workers (NUMBA_NUM_THREADS, NOTC_JOB_WORKERS, NOTC_BATCH_WORKERS)
+instead of every worker claiming every core. The Numba threading layer
+defaults to workqueue: the master compiles the parallel shading kernel,
+which starts the layer's thread pool, and the tbb and GNU OpenMP pools
+hang or abort in a forked child.
+"""
+import gc
+import os
+
+cpus = os.cpu_count() or 1
+
+bind = os.getenv("NOTC_BIND", "0.0.0.0:5054")
+workers = int(os.getenv("NOTC_WEB_WORKERS", "1"))
+if workers > 1:
+    missing = [name for name, ok in (
+        ("NOTC_SOCKETIO_WEBSOCKET_ONLY=1", os.getenv("NOTC_SOCKETIO_WEBSOCKET_ONLY") == "1"),
+        ("NOTC_SOCKETIO_MESSAGE_QUEUE", bool(os.getenv("NOTC_SOCKETIO_MESSAGE_QUEUE"))),
+    ) if not ok]
+    if missing:
+        raise RuntimeError(f"NOTC_WEB_WORKERS={workers} needs {' and '.join(missing)}: "
+                           "Socket.IO sessions cannot span workers otherwise")
+worker_class = "gthread"
+threads = int(os.getenv("NOTC_WEB_THREADS", "4"))
+timeout = int(os.getenv("NOTC_WEB_TIMEOUT", "300"))
+max_requests = int(os.getenv("NOTC_WEB_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("NOTC_WEB_MAX_REQUESTS_JITTER", "100"))
+preload_app = True
+
+# read by the app on import, so they are set before wsgi:app is loaded
+per_worker = str(max(1, cpus // workers))
+for name in ("NUMBA_NUM_THREADS", "NOTC_JOB_WORKERS", "NOTC_BATCH_WORKERS"):
+    os.environ.setdefault(name, per_worker)
+os.environ.setdefault("NUMBA_THREADING_LAYER", "workqueue")
+# a background warm-up thread must not be running when the master forks
+if os.getenv("NOTC_WARMUP") != "off":
+    os.environ["NOTC_WARMUP"] = "sync"
+
+
+def when_ready(server):
+    # everything loaded so far lives as long as the master; keep the
+    # collector from touching (and un-sharing) those pages in the workers
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # connections opened by the master (db.create_all) must not be shared
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
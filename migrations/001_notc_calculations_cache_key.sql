@@ -0,0 +1,20 @@
+-- Result memoization on pixi.notc_calculations (app/calculations/memo.py).
+-- db.create_all() only creates missing tables, so existing databases need
+-- this applied by hand:  psql "$DATABASE_URL" -f migrations/001_notc_calculations_cache_key.sql
+
+BEGIN;
+
+ALTER TABLE pixi.notc_calculations
+    ADD COLUMN IF NOT EXISTS cache_key     varchar(64),
+    ADD COLUMN IF NOT EXISTS kind          varchar(32),
+    ADD COLUMN IF NOT EXISTS model_version varchar(64);
+
+-- results are stored for anonymous requests as well
+ALTER TABLE pixi.notc_calculations
+    ALTER COLUMN user_id DROP NOT NULL;
+
+COMMIT;
+
+-- outside the transaction so it does not lock writes while building
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notc_calculations_cache_key
+    ON pixi.notc_calculations (cache_key, created_at);
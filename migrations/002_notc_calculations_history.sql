@@ -0,0 +1,29 @@
+-- Calculation history on pixi.notc_calculations (app/calculations/history.py).
+-- db.create_all() only creates missing tables, so existing databases need
+-- this applied by hand:  psql "$DATABASE_URL" -f migrations/002_notc_calculations_history.sql
+
+BEGIN;
+
+-- summary fields projected out of the JSONB result, so listings never read it.
+-- Adding STORED generated columns rewrites the table once, under an
+-- ACCESS EXCLUSIVE lock: run it outside peak hours on a large table.
+ALTER TABLE pixi.notc_calculations
+    ADD COLUMN IF NOT EXISTS pmax_2d_total double precision
+        GENERATED ALWAYS AS ((result -> 'yearly_totals' ->> 'Pmax_2D_total')::double precision) STORED,
+    ADD COLUMN IF NOT EXISTS pmax_3d_total double precision
+        GENERATED ALWAYS AS ((result -> 'yearly_totals' ->> 'Pmax_3D_total')::double precision) STORED,
+    ADD COLUMN IF NOT EXISTS best_tilt_3d double precision
+        GENERATED ALWAYS AS ((result ->> 'best_3D_tilt')::double precision) STORED;
+
+COMMIT;
+
+-- keyset pagination per user, newest first (scanned backwards); INCLUDE
+-- covers every listed column, so the listing is an index-only scan once the
+-- table is vacuumed. A database that ran an earlier version of this file
+-- (without model_version) needs the old index dropped first:
+--   DROP INDEX CONCURRENTLY pixi.ix_notc_calculations_user_created;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notc_calculations_user_created
+    ON pixi.notc_calculations (user_id, created_at, calc_id)
+    INCLUDE (kind, latitude, longitude, model_version, pmax_2d_total, pmax_3d_total, best_tilt_3d);
+
+ANALYZE pixi.notc_calculations;
@@ -0,0 +1,25 @@
+-- History rows for cache hits point at the stored result instead of copying
+-- it (app/calculations/memo.py record_hit).
+-- db.create_all() only creates missing tables, so existing databases need
+-- this applied by hand:  psql "$DATABASE_URL" -f migrations/003_notc_calculations_hit_rows.sql
+
+BEGIN;
+
+ALTER TABLE pixi.notc_calculations
+    ADD COLUMN IF NOT EXISTS source_calc_id uuid REFERENCES pixi.notc_calculations (calc_id);
+
+COMMIT;
+
+-- memoization lookups only consider stored results, not hit rows
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notc_calculations_cache_key_stored
+    ON pixi.notc_calculations (cache_key, created_at)
+    WHERE source_calc_id IS NULL;
+DROP INDEX CONCURRENTLY IF EXISTS pixi.ix_notc_calculations_cache_key;
+
+-- record_hit: does the user already have a row for this key
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notc_calculations_user_key
+    ON pixi.notc_calculations (user_id, cache_key);
+
+-- Hit rows written before this migration still carry a full copy of the
+-- result. They stay valid (source_calc_id NULL makes them stored results);
+-- nothing needs rewriting.
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from NOTC.diode_solver import solve_diode_current, string_current, string_mpp
+
+Q, K = 1.602e-19, 1.381e-23
+RS, RSH, N, VOC = 0.015, 2282, 1.2, 0.763
+
+
+def grid_mpp(Iph, I0, Vt, points=500):
+    V = np.linspace(0, VOC, points)
+    I = string_current(V, Iph, I0, RS, RSH, N, Vt, xtol=1e-8)
+    return (V * I).max(axis=-1)
+
+
+def exact_mpp(Iph, I0, Vt):
+    _, vmp, imp = string_mpp(Iph, I0, RS, RSH, N, Vt, VOC, xtol=1e-8)
+    return vmp * imp
+
+
+def test_diode_current_residual():
+    rng = np.random.default_rng(1)
+    V = np.linspace(0, 0.8, 50)[:, None]
+    Iph = rng.uniform(0, 3, 8)
+    I0 = 1e-12 * rng.uniform(50, 250, 8)
+    Vt = K * 298.15 / Q
+    I = solve_diode_current(V, Iph, I0, RS, RSH, N, Vt)
+    f = Iph - I0 * (np.exp((V + I * RS) / (N * Vt)) - 1) - (V + I * RS) / RSH - I
+    assert np.abs(f).max() < 1e-7
+
+
+@pytest.mark.parametrize("I0", [1e-12 * 204.9, 2e-10])
+def test_exact_mpp_finds_the_global_peak(I0):
+    # mismatched string whose P(V) has several local maxima
+    Iph = np.array([[0.072, 0.315, 1.456, 2.174, 2.558, 0.085, 0.085, 1.658]])
+    I0 = np.full((1, 8), I0)
+    Vt = K * 298.15 / Q
+    assert exact_mpp(Iph, I0, Vt)[0] >= grid_mpp(Iph, I0, Vt)[0] * (1 - 1e-9)
+
+
+def test_exact_mpp_not_below_grid_on_mismatched_rows():
+    rng = np.random.default_rng(0)
+    m = 1000
+    Iph = rng.uniform(0, 3, (m, 8)) * (rng.random((m, 8)) < 0.8)
+    Iph[: m // 3] *= rng.uniform(0.01, 1, (m // 3, 8))
+    I0 = 1e-12 * rng.uniform(50, 250, (m, 8))
+    Vt = K * (273.15 + rng.uniform(-10, 75, m)) / Q
+    pg = grid_mpp(Iph, I0, Vt)
+    pe = exact_mpp(Iph, I0, Vt)
+    assert np.all(pe >= pg * (1 - 1e-9))
@@ -0,0 +1,21 @@
+import numpy as np
+
+from NOTC.area_notc import make_area_tensor
+from NOTC.exact_shading import exact_direct_fractions
+
+
+def test_exact_fractions_of_unshaded_segments():
+    # two side-by-side flat cells, sun overhead: nothing is shaded
+    Ax, Az = np.array([0.0, 1.0]), np.zeros(2)
+    Bx, Bz = np.array([1.0, 2.0]), np.zeros(2)
+    np.testing.assert_allclose(exact_direct_fractions(Ax, Az, Bx, Bz, 0.0, 1.0), 1.0)
+
+
+def test_exact_shading_matches_dense_sampling():
+    zen = np.array([10.0, 35.0, 60.0, 75.0])
+    azi = np.array([120.0, 180.0, 230.0, 260.0])
+    tilts = np.array([0.0, 20.0, 45.0])
+    f_exact, c_exact = make_area_tensor(zen, azi, tilts, 180.0, shading="exact")
+    f_samp, c_samp = make_area_tensor(zen, azi, tilts, 180.0, samples=4000, shading="sampled")
+    np.testing.assert_allclose(c_exact, c_samp)
+    np.testing.assert_allclose(f_exact, f_samp, atol=2e-3)
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production serving (see gunicorn.conf.py):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+main.py stays the single-process development server.
+"""
+from app import create_app
+
+app = create_app()